@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Batch Mountain Generator
+
+Generates many mountain variants in one run, spread over a process pool,
+instead of calling mountain_generator.py once per variant. Every job draws
+from its own numpy.random.Generator seeded explicitly, and saves the spec
+of its mountain (see mountain_spec) next to the height map, so any variant
+can be reproduced from its seed or replayed from its spec. A job is one
+seed and grid size: its height map is generated once and exported at every
+threshold.
+
+Usage:
+    python batch_generate.py --count 100 --base-seed 7 --grid-sizes 40 80
+    python batch_generate.py --seeds 11 42 1234 --thresholds 0.05 0.1
+"""
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def derive_seeds(count, base_seed=0):
+    """Derive ``count`` well-separated job seeds from one base seed."""
+    return [int(seed) for seed in np.random.SeedSequence(base_seed).generate_state(count)]
+
+
+def make_jobs(seeds, grid_sizes=(40,), thresholds=(0.1,), window_sigmas=None,
+              output_dir='batch_output', cache=False):
+    """
+    Build one job per combination of seed and grid size, exporting a mesh
+    per threshold. The height map does not depend on the threshold, so it
+    is generated once per job. With cache, jobs reuse height maps and
+    meshes from identical earlier runs (see terrain_cache).
+
+    Returns:
+    --------
+    jobs : list of dict
+        Job descriptions accepted by run_job
+    """
+    jobs = []
+    for seed, grid_size in itertools.product(seeds, grid_sizes):
+        stem = f"mountain_{seed}_{grid_size}x{grid_size}"
+        jobs.append({
+            'seed': int(seed),
+            'grid_size': int(grid_size),
+            'window_sigmas': window_sigmas,
+            'heightmap': os.path.join(output_dir, f"{stem}.npy"),
+            'spec': os.path.join(output_dir, f"{stem}.json"),
+            'exports': [{'threshold': float(threshold),
+                         'obj': os.path.join(output_dir, f"{stem}_t{threshold:g}_godot.obj")}
+                        for threshold in thresholds],
+            'cache': cache,
+        })
+    return jobs
+
+
+def run_job(job):
+    """Generate a single variant and export it at every threshold; returns its manifest entry."""
+    # Imported here so only the pool workers pay for it, once each
+    from mountain_generator import export_histogram_obj_for_godot
+    from mountain_spec import generate_from_spec, sample_spec, save_spec
+
+    spec = sample_spec(job['seed'], job['grid_size'], window_sigmas=job['window_sigmas'])
+    save_spec(spec, job['spec'])
+    height_map = generate_from_spec(spec, output_file=job['heightmap'], cache=job['cache'])
+    for export in job['exports']:
+        export_histogram_obj_for_godot(height_map, export['obj'], threshold=export['threshold'],
+                                       cache=job['cache'])
+
+    entry = dict(job)
+    entry['peak_height'] = float(np.max(height_map))
+    return entry
+
+
+def generate_batch(jobs, output_dir='batch_output', workers=None):
+    """
+    Run all jobs on a process pool and write ``manifest.json``.
+
+    Parameters:
+    -----------
+    jobs : list of dict
+        Output of make_jobs
+    output_dir : str
+        Directory for the manifest (job outputs carry their own paths)
+    workers : int or None
+        Number of worker processes; None uses one per CPU
+
+    Returns:
+    --------
+    manifest : list of dict
+        One entry per job, in job order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        manifest = list(pool.map(run_job, jobs))
+
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    meshes = sum(len(entry['exports']) for entry in manifest)
+    print(f"Generated {len(manifest)} variants and {meshes} meshes, manifest saved as {manifest_path}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate mountain variants in parallel")
+    parser.add_argument('--seeds', type=int, nargs='+',
+                        help="explicit job seeds (overrides --count/--base-seed)")
+    parser.add_argument('--count', type=int, default=8,
+                        help="number of seeds to derive from --base-seed")
+    parser.add_argument('--base-seed', type=int, default=0)
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[40])
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--window-sigmas', type=float, default=None)
+    parser.add_argument('--output-dir', default='batch_output')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse height maps and meshes of identical earlier runs")
+    args = parser.parse_args()
+
+    seeds = args.seeds if args.seeds else derive_seeds(args.count, args.base_seed)
+    jobs = make_jobs(seeds, args.grid_sizes, args.thresholds, args.window_sigmas,
+                     args.output_dir, args.cache)
+    generate_batch(jobs, args.output_dir, args.workers)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Mountain pipeline benchmarks
+
+Times every stage of the pipeline with fixed seeds over a range of grid
+sizes, plus the OBJ stages on the checked-in
+normalized_histogram_mountain.obj, and records wall time and peak memory
+per stage in a JSON report. Reports of two runs can be compared, so a
+change that makes a stage slower or hungrier shows up as a regression.
+
+Time is the best of several runs (fewer at large sizes, see TIME_BUDGET).
+Peak memory is measured in one extra run under tracemalloc, which sees
+NumPy's buffers, so the timed runs are not slowed by tracing. Stages that
+would not fit in memory at a size are skipped (see STAGES).
+
+Usage:
+    python benchmark.py                                  # default sizes
+    python benchmark.py --grid-sizes 40 256 1024 4096 --report after.json
+    python benchmark.py --stages generate export_obj --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+SEED = 20240607
+GRID_SIZES = (40, 256, 1024)
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'normalized_histogram_mountain.obj')
+
+# Seconds of timed runs per stage and size, and the most runs
+TIME_BUDGET = 2.0
+MAX_REPEAT = 10
+
+# Time differences below this are noise, whatever their ratio
+NOISE_SECONDS = 0.005
+
+
+# ---------------------------------------------------------
+# Stages
+# ---------------------------------------------------------
+# Each stage runs on a state dict holding 'grid_size', the working
+# 'directory' and, once generated, the 'height_map'. Height map stages run
+# once per grid size; fixture stages once on the OBJ fixture.
+
+def _generate(state):
+    from mountain_heightmap import generate_detailed_mountain
+    state['height_map'] = generate_detailed_mountain(state['grid_size'], output_file=None,
+                                                     rng=np.random.default_rng(SEED))
+
+
+def _generate_tiled(state):
+    from mountain_heightmap import generate_detailed_mountain
+    generate_detailed_mountain(state['grid_size'], output_file=os.path.join(state['directory'], 'tiled.npy'),
+                               tile_rows=256, rng=np.random.default_rng(SEED))
+
+
+def _export_obj(state):
+    from mountain_generator import export_histogram_obj_for_godot
+    export_histogram_obj_for_godot(state['height_map'], os.path.join(state['directory'], 'bars.obj'))
+
+
+def _export_obj_greedy(state):
+    from mountain_generator import export_histogram_obj_for_godot
+    export_histogram_obj_for_godot(state['height_map'], os.path.join(state['directory'], 'greedy.obj'),
+                                   welded=True, greedy=True)
+
+
+def _export_glb(state):
+    from mountain_generator import export_histogram_glb_for_godot
+    export_histogram_glb_for_godot(state['height_map'], os.path.join(state['directory'], 'bars.glb'))
+
+
+def _quadrants(state):
+    from heightmap_quadrants import heightmap_quadrants, peak_corner
+    heightmap_quadrants(state['height_map'], 0.05, peak_corner(state['height_map']))
+
+
+def _preview(state):
+    from preview import render_histogram
+    render_histogram(state['height_map'])
+
+
+def _save_hmap(state):
+    from heightmap_format import save_heightmap
+    save_heightmap(os.path.join(state['directory'], 'heights.hmap'), state['height_map'])
+
+
+def _load_hmap_tile(state):
+    from heightmap_format import load_region
+    # One 256 x 256 tile in the middle of the map
+    start = max(state['grid_size'] // 2 - 128, 0)
+    load_region(os.path.join(state['directory'], 'heights.hmap'), (start, start + min(256, state['grid_size'])),
+                (start, start + min(256, state['grid_size'])))
+
+
+def _parse_obj_cold(state):
+    from mountain_slice import parse_obj
+    from obj_io import cache_path
+    # Without the parse cache of the copy, every run parses the text
+    path = os.path.join(state['directory'], 'fixture.obj')
+    if not os.path.exists(path):
+        shutil.copyfile(FIXTURE, path)
+    if os.path.exists(cache_path(path)):
+        os.remove(cache_path(path))
+    state['vertices'], state['faces'] = parse_obj(path)
+
+
+def _parse_obj_cached(state):
+    from mountain_slice import parse_obj
+    state['vertices'], state['faces'] = parse_obj(os.path.join(state['directory'], 'fixture.obj'))
+
+
+def _find_split(state):
+    from mountain_slice import find_highest_point_and_tile
+    # The fixture is a Z-up export
+    _, state['split_point'] = find_highest_point_and_tile(state['vertices'], up_axis=2)
+
+
+def _split_into_quadrants(state):
+    from mountain_slice import fill_sides, split_into_quadrants
+    quadrants = split_into_quadrants(state['vertices'], state['faces'], state['split_point'], clip=True,
+                                     up_axis=2)
+    fill_sides(quadrants, state['split_point'], up_axis=2)
+
+
+# Stage name, function, input ('grid' or 'fixture'), largest grid size it
+# runs at (None: no limit). Stages of one input run in this order, and
+# later stages use what earlier ones leave in the state.
+STAGES = [
+    ('generate', _generate, 'grid', None),
+    ('generate_tiled', _generate_tiled, 'grid', None),
+    ('export_obj', _export_obj, 'grid', 2048),
+    ('export_obj_greedy', _export_obj_greedy, 'grid', None),
+    ('export_glb', _export_glb, 'grid', 2048),
+    ('quadrants', _quadrants, 'grid', None),
+    ('preview', _preview, 'grid', None),
+    ('save_hmap', _save_hmap, 'grid', None),
+    ('load_hmap_tile', _load_hmap_tile, 'grid', None),
+    ('parse_obj_cold', _parse_obj_cold, 'fixture', None),
+    ('parse_obj_cached', _parse_obj_cached, 'fixture', None),
+    ('find_split', _find_split, 'fixture', None),
+    ('split_into_quadrants', _split_into_quadrants, 'fixture', None),
+]
+
+
+# ---------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------
+
+def measure(stage, state, quiet=True):
+    """
+    Time a stage and measure its peak traced memory.
+
+    The stage is repeated until TIME_BUDGET seconds or MAX_REPEAT runs are
+    spent, so slow stages run once plus the traced run.
+
+    Returns:
+    --------
+    result : dict
+        'seconds' (best run), 'median', 'runs' and 'peak_bytes'
+    """
+    # The stages print a line per file written; keep the report readable
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    times = []
+    with output:
+        while len(times) < MAX_REPEAT and sum(times) < TIME_BUDGET:
+            start = time.perf_counter()
+            stage(state)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            stage(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'median': statistics.median(times), 'runs': len(times), 'peak_bytes': peak}
+
+
+def run_benchmarks(grid_sizes=GRID_SIZES, stage_names=None, quiet=True):
+    """
+    Run the selected stages (all by default) and collect the results.
+
+    Returns:
+    --------
+    results : list of dict
+        One entry per stage and input: 'stage', 'grid_size' (None for the
+        fixture) and the measurements of measure()
+    """
+    selected = {name for name, _, _, _ in STAGES if stage_names is None or name in stage_names}
+    # Stages that produce the inputs of later ones run even when not selected
+    producers = {'generate', 'save_hmap', 'parse_obj_cold', 'find_split'}
+    results = []
+
+    def run(stage_input, grid_size, directory):
+        state = {'grid_size': grid_size, 'directory': directory}
+        label = grid_size if stage_input == 'grid' else 'obj'
+        for name, stage, kind, max_grid in STAGES:
+            if kind != stage_input:
+                continue
+            if name not in selected:
+                if name in producers:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        stage(state)
+                continue
+            if max_grid is not None and grid_size > max_grid:
+                print(f"  {name:<22} {label:>5}  skipped (above {max_grid})")
+                continue
+            result = {'stage': name, 'grid_size': grid_size}
+            result.update(measure(stage, state, quiet))
+            results.append(result)
+            print(f"  {name:<22} {label:>5}  {result['seconds']:9.4f} s  "
+                  f"{result['peak_bytes'] / 2**20:9.1f} MiB  ({result['runs']} runs)")
+
+    kinds = {kind for name, _, kind, _ in STAGES if name in selected}
+    with tempfile.TemporaryDirectory() as directory:
+        if 'grid' in kinds:
+            for grid_size in grid_sizes:
+                run('grid', grid_size, directory)
+        if 'fixture' in kinds:
+            run('fixture', None, directory)
+    return results
+
+
+# ---------------------------------------------------------
+# Reports
+# ---------------------------------------------------------
+
+def machine_info():
+    """Where the numbers come from."""
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()}
+
+
+def save_report(filename, results):
+    with open(filename, 'w') as f:
+        json.dump({'seed': SEED, 'machine': machine_info(), 'results': results}, f, indent=2)
+    print(f"Report saved as {filename}")
+
+
+def compare_reports(baseline, results, tolerance=0.2):
+    """
+    Print the change of every stage against a baseline report.
+
+    A stage regresses when its time or peak memory grew by more than
+    ``tolerance`` (0.2 = 20%); time only counts beyond NOISE_SECONDS.
+
+    Returns:
+    --------
+    regressions : list of dict
+        Results that regressed
+    """
+    before = {(entry['stage'], entry['grid_size']): entry for entry in baseline['results']}
+    regressions = []
+    for result in results:
+        old = before.get((result['stage'], result['grid_size']))
+        if old is None:
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] else 1.0
+        memory_ratio = result['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else 1.0
+        slower = time_ratio > 1 + tolerance and result['seconds'] - old['seconds'] > NOISE_SECONDS
+        regressed = slower or memory_ratio > 1 + tolerance
+        if regressed:
+            regressions.append(result)
+        label = result['grid_size'] if result['grid_size'] is not None else 'obj'
+        print(f"  {result['stage']:<22} {label:>5}  time x{time_ratio:5.2f}  memory x{memory_ratio:5.2f}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the mountain pipeline stages")
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=list(GRID_SIZES))
+    parser.add_argument('--stages', nargs='+', choices=[stage[0] for stage in STAGES],
+                        help="stages to measure (default: all)")
+    parser.add_argument('--report', default='benchmark_report.json', help="JSON report to write")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="relative slowdown or memory growth counted as a regression")
+    parser.add_argument('--verbose', action='store_true', help="show the stages' own output")
+    args = parser.parse_args()
+
+    print(f"Benchmarking with seed {SEED}")
+    results = run_benchmarks(args.grid_sizes, args.stages, quiet=not args.verbose)
+    save_report(args.report, results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        regressions = compare_reports(baseline, results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions")
+            sys.exit(1)
@@ -0,0 +1,252 @@
+"""
+Compact chunked height map files (.hmap).
+
+Height maps were saved as float64 .npy, 8 bytes per cell, although the
+heights span a few units and end up bucketed into bars. An .hmap file
+stores them quantized to 16 bits and compressed in fixed-size square
+chunks, with an index of where every chunk starts, so any tile can be read
+by decompressing only the chunks it overlaps.
+
+Layout (little endian):
+
+- header: magic b'MHMP', version, encoding, compression, filters, map rows
+  and columns, chunk size, scale and offset (see _HEADER),
+- index: uint64 file offsets of the chunks in row-major chunk order, plus
+  the end of the last one,
+- the compressed chunks.
+
+Encodings:
+
+- 'uint16': height = offset + scale * q with offset = min and scale =
+  (max - min) / 65535, so the error is at most scale / 2 (about 1e-4 for
+  a 15 unit mountain) and a map with minimum 0 keeps its zeros exact.
+  Chunks are stored as differences along each row, then byte-shuffled
+  (all low bytes, then all high bytes), which zlib compresses 2x better
+  than the plain values.
+- 'float16': half floats, byte-shuffled; relative error 2^-11.
+
+Compression is zlib, or zstd when the zstandard package is installed.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+from instrumentation import instrumented
+
+MAGIC = b'MHMP'
+VERSION = 1
+
+# magic, version, encoding, compression, filters, (pad), rows, cols, chunk, scale, offset
+_HEADER = struct.Struct('<4sHBBBxIIIdd')
+
+_ENCODINGS = {'uint16': 1, 'float16': 2}
+_COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2}
+
+# Filter bits
+_DELTA = 1
+_SHUFFLE = 2
+
+DEFAULT_CHUNK = 256
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression needs the zstandard package; use compression='zlib'") from None
+    return zstandard
+
+
+def _compressor(compression, level):
+    if compression == 'zlib':
+        return lambda data: zlib.compress(data, level)
+    if compression == 'zstd':
+        return _zstd().ZstdCompressor(level=level).compress
+    if compression == 'none':
+        return bytes
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompressor(code):
+    if code == _COMPRESSIONS['zlib']:
+        return zlib.decompress
+    if code == _COMPRESSIONS['zstd']:
+        return _zstd().ZstdDecompressor().decompress
+    if code == _COMPRESSIONS['none']:
+        return bytes
+    raise ValueError(f"Unknown compression code: {code}")
+
+
+def _encode_chunk(values, filters):
+    """Filtered bytes of a 2D uint16 / float16 chunk."""
+    if filters & _DELTA:
+        values = np.diff(values, axis=1, prepend=np.zeros((values.shape[0], 1), values.dtype))
+    data = np.ascontiguousarray(values).view(np.uint8)
+    if filters & _SHUFFLE:
+        data = data.reshape(-1, 2).T
+    return data.tobytes()
+
+
+def _decode_chunk(data, shape, dtype, filters):
+    """Inverse of _encode_chunk."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if filters & _SHUFFLE:
+        raw = raw.reshape(2, -1).T
+    values = np.ascontiguousarray(raw).view(dtype).reshape(shape)
+    if filters & _DELTA:
+        # uint16 sums wrap around exactly like the differences did
+        values = np.cumsum(values, axis=1, dtype=values.dtype)
+    return values
+
+
+@instrumented()
+def save_heightmap(filename, height_map, encoding='uint16', chunk=DEFAULT_CHUNK, compression='zlib', level=6):
+    """
+    Write a height map as a compact .hmap file.
+
+    The map is read one band of chunk rows at a time, so a memory-mapped
+    .npy (see mountain_tiles) is packed without loading it whole.
+
+    Parameters:
+    -----------
+    filename : str
+        Output file
+    height_map : numpy.ndarray
+        2D height map data
+    encoding : str
+        'uint16' (quantized between the minimum and maximum) or 'float16'
+    chunk : int
+        Side of the square chunks in cells
+    compression : str
+        'zlib', 'zstd' (needs the zstandard package) or 'none'
+    level : int
+        Compression level
+
+    Returns:
+    --------
+    size : int
+        Bytes written
+    """
+    if encoding not in _ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+    compress = _compressor(compression, level)
+    n_rows, n_cols = height_map.shape
+    chunk_rows, chunk_cols = -(-n_rows // chunk), -(-n_cols // chunk)
+
+    if encoding == 'uint16':
+        offset = float(np.min(height_map))
+        scale = (float(np.max(height_map)) - offset) / 65535 or 1.0
+        filters = _DELTA | _SHUFFLE
+    else:
+        offset, scale = 0.0, 1.0
+        filters = _SHUFFLE
+
+    header = _HEADER.pack(MAGIC, VERSION, _ENCODINGS[encoding], _COMPRESSIONS[compression], filters,
+                          n_rows, n_cols, chunk, scale, offset)
+    index = np.zeros(chunk_rows * chunk_cols + 1, dtype='<u8')
+    position = len(header) + index.nbytes
+
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.write(index.tobytes())
+        for band in range(chunk_rows):
+            rows = np.asarray(height_map[band * chunk:(band + 1) * chunk], dtype=np.float64)
+            if encoding == 'uint16':
+                values = np.round((rows - offset) / scale).astype(np.uint16)
+            else:
+                values = rows.astype(np.float16)
+            for column in range(chunk_cols):
+                data = compress(_encode_chunk(values[:, column * chunk:(column + 1) * chunk], filters))
+                index[band * chunk_cols + column] = position
+                f.write(data)
+                position += len(data)
+        index[-1] = position
+        f.seek(len(header))
+        f.write(index.tobytes())
+    return position
+
+
+def read_header(f):
+    """
+    Header and chunk index of an open .hmap file.
+
+    Returns:
+    --------
+    header : dict
+        'shape', 'chunk', 'encoding', 'compression' and 'filters' codes,
+        'scale', 'offset' and the chunk 'index' (file offsets)
+    """
+    fields = _HEADER.unpack(f.read(_HEADER.size))
+    magic, version, encoding, compression, filters, n_rows, n_cols, chunk, scale, offset = fields
+    if magic != MAGIC:
+        raise ValueError("Not a compact height map file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported height map file version: {version}")
+    n_chunks = -(-n_rows // chunk) * -(-n_cols // chunk)
+    index = np.frombuffer(f.read(8 * (n_chunks + 1)), dtype='<u8')
+    return {'shape': (n_rows, n_cols), 'chunk': chunk, 'encoding': encoding, 'compression': compression,
+            'filters': filters, 'scale': scale, 'offset': offset, 'index': index}
+
+
+@instrumented()
+def load_region(filename, rows=None, cols=None):
+    """
+    Read the cells [rows[0], rows[1]) x [cols[0], cols[1]) of an .hmap file,
+    decompressing only the chunks they overlap.
+
+    Parameters:
+    -----------
+    filename : str
+        .hmap file
+    rows, cols : tuple of int or None
+        Half-open ranges; None means all
+
+    Returns:
+    --------
+    heights : numpy.ndarray
+        float64 heights of the region
+    """
+    with open(filename, 'rb') as f:
+        header = read_header(f)
+        n_rows, n_cols = header['shape']
+        r0, r1 = rows if rows is not None else (0, n_rows)
+        c0, c1 = cols if cols is not None else (0, n_cols)
+        if not (0 <= r0 <= r1 <= n_rows and 0 <= c0 <= c1 <= n_cols):
+            raise ValueError(f"Region {rows} x {cols} is outside the {n_rows}x{n_cols} map")
+
+        chunk = header['chunk']
+        chunk_cols = -(-n_cols // chunk)
+        dtype = np.dtype('<u2') if header['encoding'] == _ENCODINGS['uint16'] else np.dtype('<f2')
+        decompress = _decompressor(header['compression'])
+        index = header['index']
+
+        heights = np.empty((r1 - r0, c1 - c0))
+        for band in range(r0 // chunk, -(-r1 // chunk)):
+            for column in range(c0 // chunk, -(-c1 // chunk)):
+                k = band * chunk_cols + column
+                f.seek(int(index[k]))
+                data = decompress(f.read(int(index[k + 1] - index[k])))
+                top, left = band * chunk, column * chunk
+                shape = (min(chunk, n_rows - top), min(chunk, n_cols - left))
+                values = _decode_chunk(data, shape, dtype, header['filters'])
+
+                # Overlap of the chunk with the region, in map coordinates
+                a0, a1 = max(r0, top), min(r1, top + shape[0])
+                b0, b1 = max(c0, left), min(c1, left + shape[1])
+                heights[a0 - r0:a1 - r0, b0 - c0:b1 - c0] = values[a0 - top:a1 - top, b0 - left:b1 - left]
+
+    if header['encoding'] == _ENCODINGS['uint16']:
+        heights *= header['scale']
+        heights += header['offset']
+    return heights
+
+
+def load_heightmap(filename, mmap_mode=None):
+    """
+    Whole height map from an .hmap file, or from a .npy file as saved by
+    the generator (memory-mapped with ``mmap_mode``).
+    """
+    if filename.endswith('.npy'):
+        return np.load(filename, mmap_mode=mmap_mode)
+    return load_region(filename)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Heightmap Quadrants
+
+Builds the four quadrant meshes of a mountain straight from its height map.
+The old flow exported the whole mountain as OBJ, cut it in Blender, re-read
+it in obj_parsing.py and again in mountain_slice.py, parsing the same mesh
+from text at every step. Since the source is a regular grid, splitting the
+height map at the peak cell and building every quadrant from its slice of
+the grid gives the same geometry directly: welded columns (see
+mesh_export.column_mesh), each quadrant with its own side walls along the
+split lines. With their bottom faces the quadrants are closed meshes: every
+edge is shared by two faces, also where the greedy rectangles meet.
+
+Usage:
+    python heightmap_quadrants.py detailed_mountain_data.npy --threshold 0.1
+    python heightmap_quadrants.py detailed_mountain_data.npy --format glb --greedy
+"""
+import argparse
+
+import numpy as np
+
+from heightmap_format import load_heightmap
+from instrumentation import instrumented
+from mesh_export import column_mesh, grid_cell_edges
+from mesh_partition import write_regions
+
+# Quadrant names, in the order of mountain_slice.QUADRANTS
+QUADRANTS = ('sw', 'se', 'nw', 'ne')
+
+
+def peak_corner(height_map):
+    """
+    Grid corner to split at: the low corner (row, column) of the highest cell.
+
+    The peak column ends up at the inner corner of the 'ne' quadrant.
+    """
+    row, col = np.unravel_index(np.argmax(height_map), height_map.shape)
+    return int(row), int(col)
+
+
+@instrumented()
+def heightmap_quadrants(height_map, threshold=0.05, split=None, y_up=True, bottom=True, greedy=False):
+    """
+    Welded column meshes of the four quadrants of a height map.
+
+    Parameters:
+    -----------
+    height_map : numpy.ndarray
+        2D height map data, in the generator's [-3, 3] grid layout
+    threshold : float
+        Minimum height of a column, as in histogram_columns
+    split : tuple of int or None
+        Grid corner (row, column) to split at; defaults to peak_corner
+    y_up : bool
+        Godot's Y-up layout if True, otherwise Z-up with heights in z
+    bottom : bool
+        Include the bottom faces; without them every quadrant is open at the
+        bottom
+    greedy : bool
+        Merge coplanar faces into rectangles (see column_mesh)
+
+    Returns:
+    --------
+    quadrants : dict
+        'sw', 'se', 'nw', 'ne' -> {'vertices', 'faces'}, faces padded with
+        -1 as column_mesh returns them; rows of the map run along z, so 's'
+        is the low z side and 'w' the low x side
+    """
+    height_map = np.asarray(height_map)
+    n_rows, n_cols = height_map.shape
+    row, col = peak_corner(height_map) if split is None else split
+    x_edges = grid_cell_edges(n_cols)
+    z_edges = grid_cell_edges(n_rows)
+    heights = np.where(height_map < threshold, 0.0, height_map)
+
+    quadrants = {}
+    bounds = [(r0, r1, c0, c1) for r0, r1 in ((0, row), (row, n_rows)) for c0, c1 in ((0, col), (col, n_cols))]
+    for name, (r0, r1, c0, c1) in zip(QUADRANTS, bounds):
+        vertices, faces = column_mesh(heights[r0:r1, c0:c1], x_edges[c0:c1 + 1], z_edges[r0:r1 + 1],
+                                      y_up=y_up, bottom=bottom, greedy=greedy)
+        quadrants[name] = {'vertices': vertices, 'faces': faces}
+    return quadrants
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the quadrant meshes of a mountain from its height map")
+    parser.add_argument('input', help="height map (.npy or .hmap) saved by the generator")
+    parser.add_argument('--threshold', type=float, default=0.05)
+    parser.add_argument('--split', type=int, nargs=2, metavar=('ROW', 'COL'),
+                        help="grid corner to split at (default: the peak cell)")
+    parser.add_argument('--greedy', action='store_true',
+                        help="merge coplanar faces into rectangles")
+    parser.add_argument('--format', choices=['obj', 'glb'], default='obj')
+    parser.add_argument('--prefix', default='mountain_quadrant')
+    args = parser.parse_args()
+
+    height_map = load_heightmap(args.input)
+    split = tuple(args.split) if args.split else peak_corner(height_map)
+    print(f"Loaded {height_map.shape[0]}x{height_map.shape[1]} height map, splitting at corner {split}")
+
+    quadrants = heightmap_quadrants(height_map, args.threshold, split, greedy=args.greedy)
+    for name in write_regions(quadrants, args.prefix, args.format):
+        print(f"Wrote {name}: {len(quadrants[name]['vertices'])} vertices, {len(quadrants[name]['faces'])} faces")
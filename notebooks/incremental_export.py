@@ -0,0 +1,151 @@
+"""
+Incremental histogram OBJ export.
+
+Re-exporting after a local edit (a few stones, one ridge) used to rebuild
+and rewrite every bar. Here the OBJ is assembled from fragments cached in
+a directory next to it:
+
+- the vertex lines of every band of BAND_ROWS height map rows; bars are
+  listed row by row, so each band is one contiguous stretch of the file,
+- the face lines in blocks of FACE_BLOCK_BARS bars; every bar has 8
+  vertices and the same 6 faces, so the face lines of bar k only depend on
+  k and a block never changes once written.
+
+The height map the fragments were built from is kept with them. A new
+export compares against it, rebuilds only the bands with changed cells
+(plus the last, partial face block) and concatenates the fragments. The
+result is byte for byte the file a full export writes.
+"""
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+
+from instrumentation import instrumented
+from mesh_export import BAR_FACES_Y_UP, BAR_FACES_Z_UP, histogram_bars, write_obj_faces, write_obj_vertices
+
+# Height map rows per vertex fragment
+BAND_ROWS = 16
+
+# Bars per face fragment
+FACE_BLOCK_BARS = 2**16
+
+
+def fragment_dir(filename):
+    """Location of the fragment cache of an exported OBJ file."""
+    return f"{filename}.tiles"
+
+
+def _band_path(directory, band):
+    return os.path.join(directory, f"band_{band:05d}.obj")
+
+
+def _face_block_path(directory, block):
+    return os.path.join(directory, f"faces_{block:05d}.obj")
+
+
+def _face_lines(first_bar, n_bars, y_up):
+    """Face lines of bars [first_bar, first_bar + n_bars) as bytes."""
+    bar_faces = BAR_FACES_Y_UP if y_up else BAR_FACES_Z_UP
+    base = 8 * np.arange(first_bar, first_bar + n_bars)
+    buffer = io.BytesIO()
+    write_obj_faces(buffer, (base[:, None, None] + bar_faces[None, :, :]).reshape(-1, bar_faces.shape[1]))
+    return buffer.getvalue()
+
+
+def dirty_bands(height_map, previous, band_rows=BAND_ROWS):
+    """Indices of the bands of rows where the two height maps differ."""
+    changed_rows = np.any(height_map != previous, axis=1)
+    n_bands = -(-len(changed_rows) // band_rows)
+    changed_rows = np.pad(changed_rows, (0, n_bands * band_rows - len(changed_rows)))
+    return np.flatnonzero(changed_rows.reshape(n_bands, band_rows).any(axis=1))
+
+
+@instrumented()
+def export_incremental(height_map, filename, header, threshold=0.05, y_up=True, band_rows=BAND_ROWS):
+    """
+    Write the histogram bars OBJ, rebuilding only what changed since the
+    previous export to the same file.
+
+    Parameters:
+    -----------
+    height_map : numpy.ndarray
+        2D height map data
+    filename : str
+        Output OBJ filename; fragments are cached in fragment_dir(filename)
+    header : bytes
+        Comment lines written before the vertices
+    threshold : float
+        Minimum height threshold to include a bar
+    y_up : bool
+        Godot's Y-up layout if True, otherwise Z-up with heights in z
+    band_rows : int
+        Height map rows per vertex fragment
+
+    Returns:
+    --------
+    rebuilt : int
+        Number of bands rebuilt
+    """
+    height_map = np.asarray(height_map)
+    directory = fragment_dir(filename)
+    n_bands = -(-height_map.shape[0] // band_rows)
+    settings = {'shape': list(height_map.shape), 'threshold': float(threshold), 'y_up': bool(y_up),
+                'band_rows': band_rows, 'face_block_bars': FACE_BLOCK_BARS}
+
+    # Compare against the height map of the previous export; anything
+    # unexpected about the cache rebuilds everything
+    bars = None
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        previous = np.load(os.path.join(directory, 'heights.npy'))
+        if manifest['settings'] == settings and previous.shape == height_map.shape:
+            bars = manifest['bars']
+            dirty = dirty_bands(height_map, previous, band_rows)
+    except (OSError, ValueError, KeyError):
+        pass
+    if bars is None:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        bars = [0] * n_bands
+        dirty = np.arange(n_bands)
+    elif len(dirty):
+        # Fragments are about to change; an interrupted update must not
+        # look valid next time
+        os.remove(os.path.join(directory, 'manifest.json'))
+
+    # Vertex lines of the changed bands
+    for band in dirty.tolist():
+        rows = (band * band_rows, min((band + 1) * band_rows, height_map.shape[0]))
+        vertices, _ = histogram_bars(height_map, threshold, y_up=y_up, row_range=rows)
+        with open(_band_path(directory, band), 'wb') as f:
+            write_obj_vertices(f, vertices)
+        bars[band] = len(vertices) // 8
+
+    # Face lines: whole blocks are cached, the last partial block is not
+    total = sum(bars)
+    full_blocks, remainder = divmod(total, FACE_BLOCK_BARS)
+    for block in range(full_blocks):
+        path = _face_block_path(directory, block)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(_face_lines(block * FACE_BLOCK_BARS, FACE_BLOCK_BARS, y_up))
+
+    with open(filename, 'wb') as out:
+        out.write(header)
+        for path in [_band_path(directory, band) for band in range(n_bands)] + \
+                    [_face_block_path(directory, block) for block in range(full_blocks)]:
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, out)
+        out.write(_face_lines(full_blocks * FACE_BLOCK_BARS, remainder, y_up))
+
+    # Record what the fragments now hold, manifest last
+    np.save(os.path.join(directory, 'heights.npy'), height_map)
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump({'settings': settings, 'bars': bars}, f)
+
+    print(f"Rebuilt {len(dirty)} of {n_bands} bands of {band_rows} rows")
+    return len(dirty)
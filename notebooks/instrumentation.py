@@ -0,0 +1,220 @@
+"""
+Stage instrumentation for the generator, exporters and slicer.
+
+Named stages record wall time, CPU time (of the whole process, so NumPy's
+threads count) and, optionally, the allocation peak above the memory in
+use when the stage began (tracemalloc). Stages nest; a stage's peak
+includes the stages inside it.
+
+    with stage('texture filter', layers=3):
+        ...
+
+    @instrumented()            # named <module file>.<function>
+    def histogram_bars(...):
+        ...
+
+Recording is off by default. Then stage() hands out a shared no-op
+context and instrumented functions are called straight through after one
+flag check, so the hooks can stay in hot code. enable() turns recording
+on; the events can be summarized or written as JSON or as a Chrome
+trace-event file (chrome://tracing, https://ui.perfetto.dev).
+
+Environment:
+    MOUNTAIN_TRACE          record the whole run and write the trace to this
+                            file at exit; "{pid}" in it is replaced by the
+                            process id, for builds running many processes
+    MOUNTAIN_TRACE_FORMAT   'chrome' (default) or 'json'
+    MOUNTAIN_TRACE_MEMORY   1 to also record allocation peaks (slower)
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_enabled = False
+_memory = False
+_started_tracemalloc = False
+_epoch = time.perf_counter()
+_events = []
+_local = threading.local()
+_NO_STAGE = contextlib.nullcontext()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Stage:
+    """A recording stage; see stage()."""
+
+    __slots__ = ('name', 'args', 'start', 'cpu', 'base', 'peak')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = _stack()
+        if _memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak is reset for this stage; the enclosing one keeps its own
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.base = self.peak = current
+        stack.append(self)
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu
+        stack = _stack()
+        stack.pop()
+        event = {'name': self.name, 'start': self.start - _epoch, 'wall': wall, 'cpu': cpu,
+                 'depth': len(stack), 'thread': threading.get_ident()}
+        if _memory:
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            event['peak_bytes'] = peak - self.base
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+        if self.args:
+            event['args'] = self.args
+        _events.append(event)
+        return False
+
+
+def stage(name, **args):
+    """
+    Context manager recording the enclosed block as stage ``name``.
+
+    Keyword arguments are stored with the event (JSON-able values).
+    """
+    if not _enabled:
+        return _NO_STAGE
+    return _Stage(name, args)
+
+
+def instrumented(name=None):
+    """Decorator recording every call of a function as a stage."""
+    def decorate(func):
+        # Named after the file, which stays the same when it runs as __main__
+        module = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+        label = name or f"{module}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(label, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(memory=False):
+    """Start recording; with memory, allocation peaks too (starts tracemalloc)."""
+    global _enabled, _memory, _started_tracemalloc
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _memory = memory
+    _enabled = True
+
+
+def disable():
+    """Stop recording; the events recorded so far are kept."""
+    global _enabled, _memory, _started_tracemalloc
+    _enabled = _memory = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def reset():
+    """Drop the recorded events."""
+    del _events[:]
+
+
+def events():
+    """Recorded events in the order the stages finished."""
+    return list(_events)
+
+
+def summary():
+    """
+    Totals per stage name.
+
+    Returns:
+    --------
+    totals : dict
+        Per name: 'calls', 'wall' and 'cpu' seconds and, when memory was
+        recorded, the largest 'peak_bytes'
+    """
+    totals = {}
+    for event in _events:
+        total = totals.setdefault(event['name'], {'calls': 0, 'wall': 0.0, 'cpu': 0.0})
+        total['calls'] += 1
+        total['wall'] += event['wall']
+        total['cpu'] += event['cpu']
+        if 'peak_bytes' in event:
+            total['peak_bytes'] = max(total.get('peak_bytes', 0), event['peak_bytes'])
+    return totals
+
+
+def print_summary():
+    """Print the totals of every stage, slowest first."""
+    totals = sorted(summary().items(), key=lambda item: -item[1]['wall'])
+    for name, total in totals:
+        memory = f"  {total['peak_bytes'] / 2**20:9.1f} MiB" if 'peak_bytes' in total else ""
+        print(f"  {name:<48} {total['calls']:5d}x  {total['wall']:9.4f} s wall  {total['cpu']:9.4f} s cpu{memory}")
+
+
+def dump_json(filename):
+    """Write the events and their summary as JSON."""
+    with open(filename, 'w') as f:
+        json.dump({'events': _events, 'summary': summary()}, f, indent=1)
+
+
+def dump_chrome_trace(filename):
+    """Write the events in the Chrome trace-event format (complete events)."""
+    pid = os.getpid()
+    trace = []
+    for event in _events:
+        args = {'cpu_ms': event['cpu'] * 1e3}
+        if 'peak_bytes' in event:
+            args['peak_bytes'] = event['peak_bytes']
+        args.update(event.get('args', {}))
+        trace.append({'name': event['name'], 'ph': 'X', 'ts': event['start'] * 1e6, 'dur': event['wall'] * 1e6,
+                      'pid': pid, 'tid': event['thread'], 'args': args})
+    with open(filename, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+def dump(filename, trace_format='chrome'):
+    """Write the trace as 'chrome' trace events or as 'json' events."""
+    if trace_format not in ('chrome', 'json'):
+        raise ValueError(f"Unknown trace format: {trace_format}")
+    if trace_format == 'chrome':
+        dump_chrome_trace(filename)
+    else:
+        dump_json(filename)
+    print(f"Trace saved as {filename}")
+
+
+def _dump_at_exit():
+    dump(os.environ['MOUNTAIN_TRACE'].replace('{pid}', str(os.getpid())),
+         os.environ.get('MOUNTAIN_TRACE_FORMAT', 'chrome'))
+
+
+if os.environ.get('MOUNTAIN_TRACE'):
+    enable(memory=os.environ.get('MOUNTAIN_TRACE_MEMORY') == '1')
+    atexit.register(_dump_at_exit)
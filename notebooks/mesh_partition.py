@@ -0,0 +1,784 @@
+#!/usr/bin/env python3
+"""
+Mesh Partitioning
+
+Cuts a mountain mesh into regions: an N x M grid of tiles (streaming
+chunks, multiplayer regions) or K radial sectors around the peak. The
+4-quadrant split of mountain_slice.py is the 1 x 1 split line special case
+of the grid.
+
+Every vertex gets a region code in one vectorized pass. Vertices and faces
+are then sorted by region once, and each region is a slice of the sorted
+arrays, so throughput does not depend on the number of regions. A face
+belongs to a region if all of its vertices are in it; faces that straddle a
+region boundary are dropped, or for grids clipped exactly at the split
+planes (clip_grid).
+
+Usage:
+    python mesh_partition.py normalized_histogram_mountain.obj --grid 3 3
+    python mesh_partition.py normalized_histogram_mountain.obj --sectors 6 --format glb
+"""
+import argparse
+
+import numpy as np
+
+from instrumentation import instrumented
+from mesh_export import write_glb, write_obj_vertices, write_obj_faces
+from obj_io import read_obj, face_array
+
+
+def grid_region_codes(vertices, x_splits, z_splits, axes=(0, 2)):
+    """
+    Grid cell of every vertex, numbered row-major along x then z.
+
+    ``axes`` are the ground axes the x and z splits apply to: (0, 2) for
+    Godot's Y-up meshes, (0, 1) for Z-up ones (see ground_axes). A vertex on
+    a split line belongs to the lower cell, and NaN to the last one, like
+    the quadrant split.
+    """
+    ix = np.searchsorted(np.asarray(x_splits, dtype=np.float64), vertices[:, axes[0]], side='left')
+    iz = np.searchsorted(np.asarray(z_splits, dtype=np.float64), vertices[:, axes[1]], side='left')
+    return iz * (len(x_splits) + 1) + ix
+
+
+def sector_region_codes(vertices, n_sectors, center, start_angle=0.0, axes=(0, 2)):
+    """
+    Radial sector of every vertex around ``center`` = (x, z).
+
+    Sectors are equal angles counterclockwise in the ground plane spanned
+    by ``axes`` (x-z by default), starting at ``start_angle`` radians from
+    the first axis.
+    """
+    angle = np.arctan2(vertices[:, axes[1]] - center[1], vertices[:, axes[0]] - center[0])
+    turn = np.mod(angle - start_angle, 2 * np.pi) / (2 * np.pi)
+    return np.minimum((turn * n_sectors).astype(np.int64), n_sectors - 1)
+
+
+@instrumented()
+def partition_mesh(vertices, faces, codes, n_regions):
+    """
+    Split a mesh by a region code per vertex.
+
+    Parameters:
+    -----------
+    vertices : array-like
+        (n, 3) vertex positions
+    faces : array-like or list
+        (m, k) indices padded with -1, or a ragged list of index lists
+    codes : numpy.ndarray
+        Region of every vertex, in [0, n_regions)
+    n_regions : int
+        Number of regions
+
+    Returns:
+    --------
+    regions : list of dict
+        Per region: 'vertices' positions, 'faces' as a -1 padded index
+        array into them, 'sizes' of the faces, and 'vertex_ids', the input
+        index of every vertex
+    """
+    vertex_array = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    face_indices, sizes = face_array(faces)
+
+    # Vertices grouped by region, keeping input order within a region
+    vertex_order = np.argsort(codes, kind='stable')
+    vertex_counts = np.bincount(codes, minlength=n_regions)
+    vertex_starts = np.cumsum(vertex_counts) - vertex_counts
+    local = np.empty(len(codes), dtype=np.int64)
+    local[vertex_order] = np.arange(len(codes)) - np.repeat(vertex_starts, vertex_counts)
+
+    # A face belongs to a region if ALL of its vertices are in it; faces
+    # with an unknown vertex are dropped
+    used = np.arange(face_indices.shape[1]) < sizes[:, None]
+    known = (face_indices >= 0) & (face_indices < len(codes))
+    safe = np.where(known, face_indices, 0)
+    face_codes = codes[safe]
+    keep = np.all(known | ~used, axis=1)
+    keep &= np.all((face_codes == face_codes[:, :1]) | ~used, axis=1)
+    face_region = np.where(sizes > 0, face_codes[:, 0] if face_codes.shape[1] else 0, 0)
+    remapped = np.where(used & known, local[safe], -1)
+
+    kept = np.flatnonzero(keep)
+    face_order = kept[np.argsort(face_region[kept], kind='stable')]
+    face_counts = np.bincount(face_region[kept], minlength=n_regions)
+    face_starts = np.cumsum(face_counts) - face_counts
+
+    regions = []
+    for region in range(n_regions):
+        members = vertex_order[vertex_starts[region]:vertex_starts[region] + vertex_counts[region]]
+        rows = face_order[face_starts[region]:face_starts[region] + face_counts[region]]
+        regions.append({
+            'vertices': vertex_array[members],
+            'faces': remapped[rows],
+            'sizes': sizes[rows],
+            'vertex_ids': members,
+        })
+    return regions
+
+
+@instrumented()
+def split_polygons(vertices, faces, sizes, axis, value, outward=True, tolerance=1e-9):
+    """
+    Clip every polygon against the plane vertices[:, axis] == value.
+
+    Sutherland-Hodgman over the whole face batch at once: each polygon is
+    cut into the part on the low side (<= value) and the part on the high
+    side (>= value). A new vertex is created once per crossing edge,
+    computed from the edge's end points in a fixed order and shared by both
+    parts and by the neighbouring polygon on the same edge, so the pieces
+    meet exactly. Vertices within ``tolerance`` (relative to the size of
+    the mesh) of the plane are moved onto it, so jittered coordinates of a
+    grid line do not leave slivers.
+
+    A polygon lying in the plane is a wall of the solid on one side: it
+    goes to the side opposite its normal (outward winding) or along it
+    (inward winding), so each side keeps its own walls and neighbouring
+    bars touching in the plane end up closed on both sides.
+
+    Parameters:
+    -----------
+    vertices : numpy.ndarray
+        (n, 3) positions
+    faces : numpy.ndarray
+        (m, k) indices padded with -1
+    sizes : numpy.ndarray
+        Size of every face
+    axis : int
+        Axis the plane is normal to
+    value : float
+        Plane position
+    outward : bool
+        Whether the polygons wind counterclockwise seen from outside (see
+        signed_volume)
+    tolerance : float
+        Relative distance below which a vertex counts as on the plane
+
+    Returns:
+    --------
+    vertices : numpy.ndarray
+        Input positions (snapped to the plane where on it) followed by the
+        new edge crossings
+    low, high : tuple
+        (faces, sizes) of the two sides, -1 padded, in input face order
+    """
+    n_faces, width = faces.shape
+    column = np.arange(width)
+    used = column < sizes[:, None]
+    safe = np.where(used, faces, 0)
+    following = np.where(column + 1 < sizes[:, None], column + 1, 0)
+    nxt = np.take_along_axis(safe, following, axis=1)
+
+    scale = tolerance * max(1.0, float(np.abs(vertices).max())) if len(vertices) else 0.0
+    on_plane = np.abs(vertices[:, axis] - value) <= scale
+    if on_plane.any():
+        vertices = vertices.copy()
+        vertices[on_plane, axis] = value
+
+    distance = np.where(used, vertices[safe, axis] - value, 0.0)
+    next_distance = np.take_along_axis(distance, following, axis=1)
+    crossing = used & (((distance < 0) & (next_distance > 0)) | ((distance > 0) & (next_distance < 0)))
+
+    # One new vertex per crossing edge, keyed by its sorted end points
+    lo = np.minimum(safe, nxt)[crossing]
+    hi = np.maximum(safe, nxt)[crossing]
+    keys, edge_ids = np.unique(lo * len(vertices) + hi, return_inverse=True)
+    lo, hi = np.divmod(keys, len(vertices))
+    d_lo = vertices[lo, axis] - value
+    d_hi = vertices[hi, axis] - value
+    t = (d_lo / (d_lo - d_hi))[:, None]
+    crossings = vertices[lo] + t * (vertices[hi] - vertices[lo])
+    crossings[:, axis] = value
+
+    new_ids = np.full(faces.shape, -1, dtype=np.int64)
+    new_ids[crossing] = len(vertices) + edge_ids.reshape(-1)
+
+    # Normal of the in-plane polygons along the axis (Newell's formula)
+    in_plane = np.all((distance == 0) | ~used, axis=1)
+    u, w = vertices[:, (axis + 1) % 3], vertices[:, (axis + 2) % 3]
+    normal = np.where(used, (u[safe] - u[nxt]) * (w[safe] + w[nxt]), 0.0).sum(axis=1)
+    facing_high = normal > 0 if outward else normal < 0
+    facing_low = normal < 0 if outward else normal > 0
+
+    # A side gets a polygon that reaches strictly into it, or an in-plane
+    # one facing the other side; a polygon merely touching the plane from
+    # the other side would leave a zero-area sliver of its corners on it
+    below = np.any(used & (distance < 0), axis=1)
+    above = np.any(used & (distance > 0), axis=1)
+    sides = []
+    for inside, take in ((distance <= 0, below | (in_plane & facing_high)),
+                         (distance >= 0, above | (in_plane & facing_low))):
+        # Slot 2c holds corner c if inside, slot 2c + 1 the crossing after it
+        slots = np.empty((n_faces, 2 * width), dtype=np.int64)
+        slots[:, 0::2] = np.where(used & inside, faces, -1)
+        slots[:, 1::2] = new_ids
+        valid = slots >= 0
+        order = np.argsort(~valid, axis=1, kind='stable')
+        clipped = np.take_along_axis(slots, order, axis=1)
+        clipped_sizes = valid.sum(axis=1)
+        keep = (clipped_sizes >= 3) & take
+        new_width = int(clipped_sizes[keep].max()) if keep.any() else width
+        sides.append((clipped[keep, :new_width], clipped_sizes[keep]))
+
+    return np.concatenate([vertices, crossings]), sides[0], sides[1]
+
+
+def signed_volume(vertices, faces, sizes):
+    """
+    Volume enclosed by a closed mesh: positive if its polygons wind
+    counterclockwise seen from outside, negative if they wind inward.
+    """
+    total = 0.0
+    for k in range(1, faces.shape[1] - 1):
+        fan = k + 1 < sizes
+        first, a, b = (vertices[faces[fan, j]] for j in (0, k, k + 1))
+        total += float(np.einsum('ij,ij->', first, np.cross(a, b)))
+    return total / 6
+
+
+def _compact(vertices, faces, sizes, n_input):
+    """Region dict holding only the vertices its faces use."""
+    used = np.unique(faces[faces >= 0])
+    remapped = np.where(faces >= 0, np.searchsorted(used, np.maximum(faces, 0)), -1)
+    return {
+        'vertices': vertices[used],
+        'faces': remapped,
+        'sizes': sizes,
+        'vertex_ids': np.where(used < n_input, used, -1),
+    }
+
+
+@instrumented()
+def clip_grid(vertices, faces, x_splits, z_splits, stitch=False, axes=(0, 2)):
+    """
+    Cut a mesh into grid regions, clipping faces that straddle a split line.
+
+    Unlike partition_mesh no face is dropped: straddling faces are cut
+    exactly at the split planes (see split_polygons) and each piece goes to
+    its region. Vertices on a split plane belong to the regions on both
+    sides, and new vertices get -1 as their 'vertex_ids'. With stitch, the
+    openings each region has on its cut planes are closed (stitch_seams).
+    ``axes`` are the ground axes of the x and z splits (see grid_region_codes).
+
+    Returns:
+    --------
+    regions : list of dict
+        In the same row-major layout and format as partition_mesh
+    """
+    vertex_array = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    n_input = len(vertex_array)
+    face_indices, sizes = face_array(faces)
+    used = np.arange(face_indices.shape[1]) < sizes[:, None]
+    known = np.all(((face_indices >= 0) & (face_indices < n_input)) | ~used, axis=1)
+    current = (np.where(used, face_indices, -1)[known & (sizes >= 3)], sizes[known & (sizes >= 3)])
+    # Faces lying in a split plane go to the side they close, by winding
+    outward = signed_volume(vertex_array, *current) >= 0
+
+    columns = []
+    for split in x_splits:
+        vertex_array, low, current = split_polygons(vertex_array, *current, axes[0], split, outward)
+        columns.append(low)
+    columns.append(current)
+
+    tiles = []
+    for column_faces in columns:
+        row = []
+        for split in z_splits:
+            vertex_array, low, column_faces = split_polygons(vertex_array, *column_faces, axes[1], split, outward)
+            row.append(low)
+        row.append(column_faces)
+        tiles.append(row)
+
+    regions = []
+    for iz in range(len(z_splits) + 1):
+        for ix in range(len(x_splits) + 1):
+            region = _compact(vertex_array, *tiles[ix][iz], n_input)
+            if stitch:
+                planes = ([(axes[0], x_splits[k]) for k in (ix - 1, ix) if 0 <= k < len(x_splits)]
+                          + [(axes[1], z_splits[k]) for k in (iz - 1, iz) if 0 <= k < len(z_splits)])
+                region = stitch_seams(region, planes)
+            regions.append(region)
+    return regions
+
+
+def _directed_edges(faces, sizes):
+    """Face row, corner and (from, to) vertices of every polygon edge."""
+    column = np.arange(faces.shape[1])
+    used = column < sizes[:, None]
+    following = np.where(column + 1 < sizes[:, None], column + 1, 0)
+    rows, columns = np.nonzero(used)
+    return rows, columns, faces[used], np.take_along_axis(faces, following, axis=1)[used]
+
+
+def open_edges(faces, sizes=None):
+    """
+    Directed edges (from, to) without exactly one matching reverse edge.
+
+    A mesh is closed (watertight and consistently wound) when there are none.
+    """
+    if sizes is None:
+        faces, sizes = face_array(faces)
+    _, _, a, b = _directed_edges(faces, sizes)
+    n = int(max(a.max(), b.max())) + 1 if len(a) else 1
+    forward = a * n + b
+    keys, counts = np.unique(forward, return_counts=True)
+    reverse = b * n + a
+    position = np.minimum(np.searchsorted(keys, reverse), len(keys) - 1)
+    matched = (keys[position] == reverse) & (counts[position] == 1)
+    bad = ~matched | (counts[np.searchsorted(keys, forward)] != 1)
+    return np.stack([a[bad], b[bad]], axis=1)
+
+
+def is_closed(faces, sizes=None):
+    """True if every edge is shared by exactly two faces with opposite directions."""
+    return len(open_edges(faces, sizes)) == 0
+
+
+def _edge_components(a, b):
+    """Connected component label of every edge of a graph given by (a, b) vertex pairs."""
+    nodes, inverse = np.unique(np.concatenate([a, b]), return_inverse=True)
+    ends = inverse.reshape(2, -1)
+    label = np.arange(len(nodes))
+    while True:
+        # Smallest label over every edge, then pointer jumping
+        previous = label
+        low = np.minimum(label[ends[0]], label[ends[1]])
+        label = label.copy()
+        np.minimum.at(label, ends[0], low)
+        np.minimum.at(label, ends[1], low)
+        label = label[label]
+        if np.array_equal(label, previous):
+            return label[ends[0]]
+
+
+@instrumented()
+def stitch_seams(region, planes, tolerance=1e-9):
+    """
+    Close the openings a clipped region has on its cut planes.
+
+    The open boundary of the region within each plane is indexed once:
+    boundary edges are found among the edges lying in the plane, and their
+    vertices are hashed by quantized in-plane coordinates. The opening is
+    then cut into slabs at every boundary vertex position along one in-plane
+    axis. In each slab the boundary edges crossing it are paired bottom to
+    top, and each pair becomes one cap polygon. Boundary edges are split at
+    the slab lines (the new vertex is inserted into the face that owns the
+    edge), so caps and mesh share every edge exactly. Caps are wound
+    against the boundary edge they close. Every connected piece of the
+    boundary is capped on its own, so the seams of touching bars, which
+    meet at coincident but distinct vertices, never share a cap.
+
+    Works for the axis-aligned (histogram) meshes of this project: every
+    seam edge must be parallel to one of the in-plane axes. Run time is
+    proportional to the size of the seams, besides one vectorized pass
+    over the edges to find them.
+
+    Parameters:
+    -----------
+    region : dict
+        Region from clip_grid ('vertices', 'faces', 'sizes', 'vertex_ids')
+    planes : list of (axis, value)
+        Cut planes to close
+    tolerance : float
+        Relative tolerance for matching in-plane coordinates and for
+        vertices lying in a plane
+
+    Returns:
+    --------
+    region : dict
+        The region with split faces and cap polygons appended
+    """
+    vertices = region['vertices']
+    faces, sizes = region['faces'], region['sizes']
+    if len(faces) == 0:
+        return region
+    scale = tolerance * max(1.0, float(np.abs(vertices).max()))
+    rows, columns, a, b = _directed_edges(faces, sizes)
+
+    new_vertices = []
+    inserts = {}        # (face row, corner) -> new vertices along that edge
+    caps = []
+
+    def quantize(values):
+        return np.round(values / scale).astype(np.int64)
+
+    def close(p_axis, q_axis, ea, eb, pa, pb, qa, qb, owners):
+        """Caps of one connected piece of seam (see the docstring)."""
+        across = (qa == qb) & (pa != pb)
+
+        # Seam points hashed by quantized coordinates: one sorted column of
+        # (q, vertex) per slab line p
+        ids = np.unique(np.concatenate([ea, eb]))
+        point_p, point_q = quantize(vertices[ids, p_axis]), quantize(vertices[ids, q_axis])
+        order = np.lexsort((point_q, point_p))
+        ids, point_p, point_q = ids[order], point_p[order], point_q[order]
+        breaks = np.unique(point_p)
+        line_start = np.searchsorted(point_p, breaks)
+        line_stop = np.searchsorted(point_p, breaks, side='right')
+        lines = {int(p): (point_q[i:j], ids[i:j]) for p, i, j in zip(breaks, line_start, line_stop)}
+
+        # Split edges across the slabs into one piece per slab
+        pieces = {}     # slab -> list of (q key, q, left vertex, right vertex, runs left to right)
+        for edge in np.flatnonzero(across):
+            lo, hi = sorted((pa[edge], pb[edge]))
+            first, last = np.searchsorted(breaks, [lo, hi])
+            inner = breaks[first + 1:last]
+            if len(inner):
+                points = np.repeat(vertices[ea[edge]][None, :], len(inner), axis=0)
+                points[:, p_axis] = [vertices[lines[int(p)][1][0], p_axis] for p in inner]
+                start = len(vertices) + sum(len(v) for v in new_vertices)
+                created = np.arange(start, start + len(inner))
+                new_vertices.append(points)
+                for p, vertex in zip(inner, created):
+                    lines[int(p)] = (np.append(lines[int(p)][0], qa[edge]),
+                                     np.append(lines[int(p)][1], vertex))
+            else:
+                created = np.empty(0, dtype=np.int64)
+            rightward = pa[edge] < pb[edge]
+            inserts[owners[edge]] = created if rightward else created[::-1]
+            chain = np.concatenate([[ea[edge] if rightward else eb[edge]], created,
+                                    [eb[edge] if rightward else ea[edge]]])
+            for slab, (left, right) in enumerate(zip(chain[:-1], chain[1:]), start=first):
+                pieces.setdefault(slab, []).append((int(qa[edge]), float(vertices[ea[edge], q_axis]),
+                                                   int(left), int(right), rightward))
+
+        # Re-sort the slab lines that received split points
+        for p, (line_q, line_ids) in lines.items():
+            order = np.argsort(line_q, kind='stable')
+            lines[p] = (line_q[order], line_ids[order])
+
+        # Pair the pieces of each slab bottom to top into caps
+        for slab, slab_pieces in pieces.items():
+            slab_pieces.sort()
+            if len(slab_pieces) % 2:
+                continue    # not a closed seam; leave it open
+            left_q, left_ids = lines[int(breaks[slab])]
+            right_q, right_ids = lines[int(breaks[slab + 1])]
+            for bottom, top in zip(slab_pieces[0::2], slab_pieces[1::2]):
+                right_side = right_ids[(right_q > bottom[0]) & (right_q < top[0])]
+                left_side = left_ids[(left_q > bottom[0]) & (left_q < top[0])][::-1]
+                cap = [bottom[2], bottom[3], *right_side, top[3], top[2], *left_side]
+                # The cap runs left to right along the bottom piece; wind it
+                # against the boundary edge it closes
+                if bottom[4]:
+                    cap = cap[::-1]
+                caps.append(cap)
+
+    cut_axes = {axis for axis, _ in planes}
+    for axis, value in planes:
+        # Slab lines run along the other cut axes, so the lines where two
+        # cut planes meet are slab lines
+        in_plane_axes = [k for k in range(3) if k != axis]
+        p_axis = next((k for k in in_plane_axes if k in cut_axes), in_plane_axes[0])
+        q_axis = next(k for k in in_plane_axes if k != p_axis)
+        in_plane = (np.abs(vertices[a, axis] - value) <= scale) & (np.abs(vertices[b, axis] - value) <= scale)
+        candidates = np.flatnonzero(in_plane)
+
+        # Boundary: plane edges not matched by a reverse edge in the plane
+        n = len(vertices)
+        forward = a[candidates] * n + b[candidates]
+        reverse = b[candidates] * n + a[candidates]
+        boundary = candidates[~np.isin(reverse, forward)]
+        if len(boundary) == 0:
+            continue
+
+        ea, eb = a[boundary], b[boundary]
+        pa, pb = quantize(vertices[ea, p_axis]), quantize(vertices[eb, p_axis])
+        qa, qb = quantize(vertices[ea, q_axis]), quantize(vertices[eb, q_axis])
+        if not np.all(((qa == qb) & (pa != pb)) | (pa == pb)):
+            raise ValueError("Seam edges must be axis-aligned to be stitched")
+        owners = list(zip(rows[boundary].tolist(), columns[boundary].tolist()))
+
+        # Every connected piece of seam (one per cut bar of a histogram) is
+        # capped on its own: touching bars have coincident seam points, and
+        # a cap must only use the vertices of its own bar. A seam that ends
+        # on a line where another cut plane crosses this one continues
+        # through the line, so its points on the line are joined.
+        join_a, join_b = [ea], [eb]
+        points = np.unique(np.concatenate([ea, eb]))
+        for other_axis, other_value in planes:
+            if other_axis != axis:
+                on_line = points[np.abs(vertices[points, other_axis] - other_value) <= scale]
+                join_a.append(on_line[:-1])
+                join_b.append(on_line[1:])
+        components = _edge_components(np.concatenate(join_a), np.concatenate(join_b))[:len(ea)]
+        order = np.argsort(components, kind='stable')
+        splits = np.flatnonzero(np.diff(components[order])) + 1
+        for edges in np.split(order, splits):
+            close(p_axis, q_axis, ea[edges], eb[edges], pa[edges], pb[edges], qa[edges], qb[edges],
+                  [owners[edge] for edge in edges])
+
+    if not caps and not inserts:
+        return region
+
+    # Faces with split edges get the new vertices inserted
+    face_lists = {}
+    for (row, column), created in inserts.items():
+        if len(created):
+            face = face_lists.setdefault(row, {})
+            face[column] = created
+    width = faces.shape[1]
+    rebuilt = {}
+    for row, extra in face_lists.items():
+        corners = faces[row, :sizes[row]].tolist()
+        polygon = []
+        for column, corner in enumerate(corners):
+            polygon.append(corner)
+            polygon.extend(extra.get(column, np.empty(0, dtype=np.int64)).tolist())
+        rebuilt[row] = polygon
+    all_faces = list(rebuilt.values()) + caps
+    width = max([width] + [len(face) for face in all_faces])
+
+    out = np.full((len(faces) + len(caps), width), -1, dtype=np.int64)
+    out[:len(faces), :faces.shape[1]] = faces
+    out_sizes = np.concatenate([sizes, [len(cap) for cap in caps]]).astype(np.int64)
+    for row, polygon in rebuilt.items():
+        out[row, :len(polygon)] = polygon
+        out_sizes[row] = len(polygon)
+    for k, cap in enumerate(caps):
+        out[len(faces) + k, :len(cap)] = cap
+
+    added = np.concatenate(new_vertices) if new_vertices else np.empty((0, 3))
+    return {
+        'vertices': np.concatenate([vertices, added]),
+        'faces': out,
+        'sizes': out_sizes,
+        'vertex_ids': np.concatenate([region['vertex_ids'], np.full(len(added), -1)]),
+    }
+
+
+def grid_lattice(values, tolerance=1e-6, max_offset=3):
+    """
+    Spacing and origin of the grid lines a set of coordinates lies on.
+
+    Coordinates closer than ``tolerance`` times the extent are merged first,
+    so floating-point jitter never shows up as a spacing. The differences
+    between each remaining line and its next ``max_offset`` neighbours are
+    then binned at the same tolerance, and the most frequent one is the
+    spacing: the cell pitch wins even when every cell contributes two lines
+    (bars with gaps) or some lines are missing. The spacing is refined as
+    the mean of the differences in that bin and its neighbours; the origin
+    is the lowest line.
+
+    Returns:
+    --------
+    spacing : float
+        Grid spacing, 0.0 if there are fewer than two distinct lines
+    origin : float
+        Lowest grid line
+    """
+    values = np.sort(np.asarray(values, dtype=np.float64).ravel())
+    if len(values) == 0:
+        return 0.0, 0.0
+    step = tolerance * max(float(values[-1] - values[0]), np.finfo(np.float64).tiny)
+    lines = values[np.concatenate([[True], np.diff(values) > step])]
+    if len(lines) < 2:
+        return 0.0, float(lines[0])
+
+    differences = np.concatenate([lines[k:] - lines[:-k] for k in range(1, min(max_offset, len(lines) - 1) + 1)])
+    bins = np.round(differences / step).astype(np.int64)
+    keys, counts = np.unique(bins, return_counts=True)
+    mode = keys[np.argmax(counts)]
+    spacing = float(differences[np.abs(bins - mode) <= 1].mean())
+    return spacing, float(lines[0])
+
+
+def _sample(vertices, sample_size):
+    """At most ``sample_size`` vertices drawn at random with a fixed seed."""
+    if len(vertices) <= sample_size:
+        return vertices
+    return vertices[np.random.default_rng(0).integers(0, len(vertices), sample_size)]
+
+
+def detect_up_axis(vertices, sample_size=2**16, tolerance=1e-6):
+    """
+    Axis of the heights of a histogram mesh, for meshes of unknown layout.
+
+    Every bar or column stands on the ground, so the minimum of the up axis
+    holds the corners of all their coplanar bottom faces, while the minimum
+    of a ground axis only holds the outer walls of the first row or column
+    of bars. The up axis is the one whose minimum holds the most vertices;
+    coordinates within ``tolerance`` times the extent of the minimum count
+    as on it. Callers that know the layout (the exporters know y_up) should
+    pass the axis instead.
+    """
+    sample = _sample(np.asarray(vertices, dtype=np.float64).reshape(-1, 3), sample_size)
+    if len(sample) == 0:
+        return 1
+    low, high = sample.min(axis=0), sample.max(axis=0)
+    step = tolerance * np.maximum(high - low, np.finfo(np.float64).tiny)
+    return int(np.argmax(np.count_nonzero(sample - low <= step, axis=0)))
+
+
+def ground_axes(vertices, up_axis=None):
+    """The two horizontal axes, in order, of a mesh with the given or detected up axis."""
+    if up_axis is None:
+        up_axis = detect_up_axis(vertices)
+    return tuple(axis for axis in range(3) if axis != up_axis)
+
+
+@instrumented()
+def analyze_grid(vertices, up_axis=None, sample_size=2**16, tolerance=1e-6):
+    """
+    Highest vertex and horizontal grid of a histogram mesh, in one pass.
+
+    Parameters:
+    -----------
+    vertices : array-like
+        (n, 3) vertex positions
+    up_axis : int or None
+        Axis of the height; detected from the vertices if None (see
+        detect_up_axis), so Godot's Y-up meshes and Z-up OBJ exports both work
+    sample_size : int
+        Grid lines are estimated from at most this many vertices drawn at
+        random (with a fixed seed); a grid line is shared by thousands of
+        vertices, so none is missed and large meshes take milliseconds
+    tolerance : float
+        Relative tolerance for merging jittered coordinates (see grid_lattice)
+
+    Returns:
+    --------
+    analysis : dict
+        'peak_index' and 'peak' (highest vertex), 'up_axis', 'axes' (the
+        two horizontal axes), 'spacing' and 'origin' (one per horizontal
+        axis)
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if len(vertices) == 0:
+        raise ValueError("No vertices to analyze")
+    sample = _sample(vertices, sample_size)
+    if up_axis is None:
+        up_axis = detect_up_axis(sample, sample_size, tolerance)
+    peak_index = int(np.argmax(vertices[:, up_axis]))
+
+    axes = ground_axes(vertices, up_axis)
+    lattices = [grid_lattice(sample[:, axis], tolerance) for axis in axes]
+    return {
+        'peak_index': peak_index,
+        'peak': vertices[peak_index],
+        'up_axis': up_axis,
+        'axes': axes,
+        'spacing': tuple(spacing for spacing, _ in lattices),
+        'origin': tuple(origin for _, origin in lattices),
+    }
+
+
+def grid_splits(vertices, n_x, n_z, axes=(0, 2)):
+    """Split lines of an n_x by n_z grid of equal tiles over the mesh footprint."""
+    x, z = vertices[:, axes[0]], vertices[:, axes[1]]
+    x_splits = np.linspace(x.min(), x.max(), n_x + 1)[1:-1]
+    z_splits = np.linspace(z.min(), z.max(), n_z + 1)[1:-1]
+    return x_splits, z_splits
+
+
+def partition_grid(vertices, faces, n_x, n_z, x_splits=None, z_splits=None, clip=False,
+                   stitch=False, axes=None, up_axis=None):
+    """
+    Cut a mesh into an n_x by n_z grid of tiles.
+
+    Split lines default to equal tiles over the footprint of the mesh. With
+    clip, faces straddling a split line are cut instead of dropped (see
+    clip_grid); stitch also closes every tile along its cuts. The ground
+    ``axes`` default to the axes other than ``up_axis``, which is detected
+    from the mesh if None (see detect_up_axis). Returns a dict of
+    'tile_<ix>_<iz>' -> region (see partition_mesh).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if axes is None:
+        axes = ground_axes(vertices, up_axis)
+    if x_splits is None or z_splits is None:
+        x_default, z_default = grid_splits(vertices, n_x, n_z, axes)
+        x_splits = x_default if x_splits is None else x_splits
+        z_splits = z_default if z_splits is None else z_splits
+
+    if clip:
+        regions = clip_grid(vertices, faces, x_splits, z_splits, stitch=stitch, axes=axes)
+    else:
+        codes = grid_region_codes(vertices, x_splits, z_splits, axes)
+        regions = partition_mesh(vertices, faces, codes, (len(x_splits) + 1) * (len(z_splits) + 1))
+    names = [f"tile_{ix}_{iz}" for iz in range(len(z_splits) + 1) for ix in range(len(x_splits) + 1)]
+    return dict(zip(names, regions))
+
+
+def partition_sectors(vertices, faces, n_sectors, center=None, start_angle=0.0, up_axis=None):
+    """
+    Cut a mesh into n_sectors radial sectors around ``center`` = (x, z).
+
+    The center defaults to the highest vertex along the up axis, which is
+    detected if None (see detect_up_axis).
+    Returns a dict of 'sector_<k>' -> region (see partition_mesh).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if up_axis is None:
+        up_axis = detect_up_axis(vertices)
+    axes = ground_axes(vertices, up_axis)
+    if center is None:
+        peak = vertices[np.argmax(vertices[:, up_axis])]
+        center = (peak[axes[0]], peak[axes[1]])
+
+    codes = sector_region_codes(vertices, n_sectors, center, start_angle, axes)
+    regions = partition_mesh(vertices, faces, codes, n_sectors)
+    return {f"sector_{k}": region for k, region in enumerate(regions)}
+
+
+@instrumented()
+def write_regions(regions, prefix, file_format='obj'):
+    """
+    Write one mesh per non-empty region.
+
+    OBJ writes <prefix>_<region>.obj files; GLB writes <prefix>.glb with
+    one primitive per region.
+
+    Returns:
+    --------
+    written : list of str
+        Names of the regions written
+    """
+    written = [name for name, region in regions.items() if len(region['faces'])]
+
+    if file_format == 'glb':
+        write_glb(f"{prefix}.glb", {name: (regions[name]['vertices'], regions[name]['faces'])
+                                    for name in written})
+        return written
+
+    for name in written:
+        region = regions[name]
+        with open(f"{prefix}_{name}.obj", 'wb') as f:
+            f.write(f"# Region {name}\n".encode())
+            f.write(f"# Vertices: {len(region['vertices'])}\n".encode())
+            f.write(f"# Faces: {len(region['faces'])}\n\n".encode())
+            write_obj_vertices(f, region['vertices'])
+            write_obj_faces(f, region['faces'])
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cut a mountain mesh into tiles or sectors")
+    parser.add_argument('input', help="input OBJ file")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--grid', type=int, nargs=2, metavar=('NX', 'NZ'))
+    group.add_argument('--sectors', type=int)
+    parser.add_argument('--clip', action='store_true',
+                        help="cut faces that straddle a grid line instead of dropping them")
+    parser.add_argument('--stitch', action='store_true',
+                        help="with --clip, close every tile with side walls along its cuts")
+    parser.add_argument('--format', choices=['obj', 'glb'], default='obj')
+    parser.add_argument('--prefix', default='mountain_region')
+    parser.add_argument('--up-axis', choices=['x', 'y', 'z', 'auto'], default='auto',
+                        help="axis of the heights: y for Godot exports, z for Z-up ones "
+                             "(default: detected from the mesh)")
+    args = parser.parse_args()
+    up_axis = None if args.up_axis == 'auto' else 'xyz'.index(args.up_axis)
+
+    vertices, faces = read_obj(args.input, dtype=np.float64)
+    print(f"Loaded {len(vertices)} vertices and {len(faces)} faces")
+
+    if args.grid:
+        regions = partition_grid(vertices, faces, *args.grid, clip=args.clip or args.stitch,
+                                 stitch=args.stitch, up_axis=up_axis)
+    else:
+        regions = partition_sectors(vertices, faces, args.sectors, up_axis=up_axis)
+
+    for name in write_regions(regions, args.prefix, args.format):
+        region = regions[name]
+        closed = " (closed)" if is_closed(region['faces'], region['sizes']) else ""
+        print(f"Wrote {name}: {len(region['vertices'])} vertices, {len(region['faces'])} faces{closed}")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Mountain command line
+
+One entry point for the generate, export, slice and preview steps. Every
+subcommand imports the modules it needs when it runs, so a process only
+pays for what it uses: scipy is loaded for generation alone, matplotlib
+never (previews are rendered by preview.py), and a step that starts from
+a saved height map loads little more than NumPy. Height maps are read and
+written as .npy or as compact .hmap files (see heightmap_format), by
+extension.
+
+Usage:
+    python mountain.py generate --seed 7 --grid-size 80 -o mountain.npy --export mountain.glb
+    python mountain.py generate --spec mountain.json -o mountain.npy
+    python mountain.py export mountain.npy mountain.obj --threshold 0.1 --incremental
+    python mountain.py slice mountain.npy --format glb
+    python mountain.py preview mountain.npy mountain.png
+    python mountain.py pack mountain.npy mountain.hmap
+    python mountain.py --trace build.json --trace-memory generate --grid-size 1024 --export m.glb
+"""
+import argparse
+import os
+
+
+def export_heightmap(height_map, filename, threshold=0.05, welded=False, greedy=False, normals=False,
+                     incremental=False, cache=False):
+    """Export the histogram mesh as OBJ or GLB, by the extension of ``filename``."""
+    from mountain_generator import export_histogram_glb_for_godot, export_histogram_obj_for_godot
+
+    if filename.lower().endswith('.glb'):
+        export_histogram_glb_for_godot(height_map, filename, threshold, normals=normals, welded=welded,
+                                       greedy=greedy, cache=cache)
+    else:
+        export_histogram_obj_for_godot(height_map, filename, threshold, welded=welded, greedy=greedy,
+                                       incremental=incremental, cache=cache)
+
+
+def generate(args):
+    import numpy as np
+    from mountain_spec import generate_from_spec, load_spec, sample_spec, save_spec
+
+    if args.spec and os.path.exists(args.spec) and args.seed is None:
+        spec = load_spec(args.spec)
+        print(f"Replaying {args.spec}")
+    else:
+        spec = sample_spec(args.seed, args.grid_size, window_sigmas=args.window_sigmas)
+        print(f"Sampled mountain with seed {spec['seed']}")
+        if args.spec:
+            save_spec(spec, args.spec)
+            print(f"Spec saved as {args.spec}")
+
+    scratch = None
+    if args.output.endswith('.npy'):
+        height_map = generate_from_spec(spec, output_file=args.output, tile_rows=args.tile_rows,
+                                        cache=args.cache)
+    else:
+        # Tiled generation writes into a mapped .npy, removed once packed and used
+        from heightmap_format import save_heightmap
+        scratch = args.output + '.npy' if args.tile_rows else None
+        height_map = generate_from_spec(spec, output_file=scratch, tile_rows=args.tile_rows, cache=args.cache)
+        save_heightmap(args.output, height_map)
+    print(f"Height map saved as {args.output}, peak {np.max(height_map):.2f}")
+
+    if args.export:
+        export_heightmap(height_map, args.export, args.threshold, cache=args.cache)
+    if args.preview:
+        from preview import save_preview
+        save_preview(height_map, args.preview)
+    if scratch:
+        del height_map
+        os.remove(scratch)
+
+
+def export(args):
+    from heightmap_format import load_heightmap
+
+    export_heightmap(load_heightmap(args.input), args.output, args.threshold, args.welded, args.greedy,
+                     args.normals, args.incremental, args.cache)
+
+
+def slice_quadrants(args):
+    from heightmap_format import load_heightmap
+    from heightmap_quadrants import heightmap_quadrants, peak_corner
+    from mesh_partition import write_regions
+
+    height_map = load_heightmap(args.input)
+    split = tuple(args.split) if args.split else peak_corner(height_map)
+    quadrants = heightmap_quadrants(height_map, args.threshold, split, greedy=args.greedy)
+    for name in write_regions(quadrants, args.prefix, args.format):
+        print(f"Wrote {name}: {len(quadrants[name]['vertices'])} vertices, {len(quadrants[name]['faces'])} faces")
+
+
+def preview(args):
+    from heightmap_format import load_heightmap
+    from preview import save_preview
+
+    output = args.output or os.path.splitext(args.input)[0] + '.png'
+    save_preview(load_heightmap(args.input), output, args.width, args.elevation)
+
+
+def pack(args):
+    from heightmap_format import load_heightmap, save_heightmap
+
+    size = save_heightmap(args.output, load_heightmap(args.input, mmap_mode='r'), args.encoding, args.chunk,
+                          args.compression)
+    print(f"Packed {args.input} ({os.path.getsize(args.input)} bytes) as {args.output} ({size} bytes)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate, export, slice and preview mountains")
+    parser.add_argument('--trace', help="record the time of every stage and write a trace to this file "
+                                        "(see instrumentation)")
+    parser.add_argument('--trace-format', choices=['chrome', 'json'], default='chrome')
+    parser.add_argument('--trace-memory', action='store_true', help="also record allocation peaks (slower)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('generate', help="generate a height map")
+    command.add_argument('--seed', type=int, default=None,
+                         help="seed of the mountain (default: fresh entropy, recorded in the spec)")
+    command.add_argument('--grid-size', type=int, default=40)
+    command.add_argument('--window-sigmas', type=float, default=None)
+    command.add_argument('--spec', help="spec (.json) to replay if it exists and no --seed is given, "
+                                        "otherwise where to save the sampled spec")
+    command.add_argument('-o', '--output', default='detailed_mountain_data.npy',
+                         help="height map (.npy, or .hmap for the compact format)")
+    command.add_argument('--tile-rows', type=int, default=None,
+                         help="generate out of core in strips of this many rows")
+    command.add_argument('--export', help="also export the histogram mesh (.obj or .glb)")
+    command.add_argument('--threshold', type=float, default=0.05)
+    command.add_argument('--preview', help="also save a preview image (.png)")
+    command.add_argument('--cache', action='store_true',
+                         help="reuse height maps and meshes of identical earlier runs")
+    command.set_defaults(run=generate)
+
+    command = commands.add_parser('export', help="export a height map as a histogram mesh")
+    command.add_argument('input', help="height map (.npy or .hmap)")
+    command.add_argument('output', help="mesh file; .glb writes binary glTF, anything else OBJ")
+    command.add_argument('--threshold', type=float, default=0.05)
+    command.add_argument('--welded', action='store_true', help="shared vertices, visible walls only")
+    command.add_argument('--greedy', action='store_true', help="welded, with coplanar faces merged")
+    command.add_argument('--normals', action='store_true', help="GLB: store flat normals")
+    command.add_argument('--incremental', action='store_true',
+                         help="OBJ: only rebuild rows changed since the previous export")
+    command.add_argument('--cache', action='store_true')
+    command.set_defaults(run=export)
+
+    command = commands.add_parser('slice', help="build the closed quadrant meshes around the peak")
+    command.add_argument('input', help="height map (.npy or .hmap)")
+    command.add_argument('--threshold', type=float, default=0.05)
+    command.add_argument('--split', type=int, nargs=2, metavar=('ROW', 'COL'),
+                         help="grid corner to split at (default: the peak cell)")
+    command.add_argument('--greedy', action='store_true')
+    command.add_argument('--format', choices=['obj', 'glb'], default='obj')
+    command.add_argument('--prefix', default='mountain_quadrant')
+    command.set_defaults(run=slice_quadrants)
+
+    command = commands.add_parser('preview', help="render a height map to PNG")
+    command.add_argument('input', help="height map (.npy or .hmap)")
+    command.add_argument('output', nargs='?', help="image file (default: input name with .png)")
+    command.add_argument('--width', type=int, default=800)
+    command.add_argument('--elevation', type=float, default=30)
+    command.set_defaults(run=preview)
+
+    command = commands.add_parser('pack', help="convert a height map to a compact .hmap file")
+    command.add_argument('input', help="height map (.npy or .hmap)")
+    command.add_argument('output', help="compact height map (.hmap)")
+    command.add_argument('--encoding', choices=['uint16', 'float16'], default='uint16')
+    command.add_argument('--chunk', type=int, default=256, help="side of the compressed chunks in cells")
+    command.add_argument('--compression', choices=['zlib', 'zstd', 'none'], default='zlib')
+    command.set_defaults(run=pack)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.trace:
+        import instrumentation
+        instrumentation.enable(memory=args.trace_memory)
+    args.run(args)
+    if args.trace:
+        instrumentation.print_summary()
+        instrumentation.dump(args.trace, args.trace_format)
@@ -0,0 +1,602 @@
+"""
+Batched feature stamping for the mountain generators.
+
+generate_detailed_mountain used to build a full-grid distance array for
+every ridge point, minor peak, stone and boulder. Here all features of one
+kind are passed as parameter arrays and evaluated in chunked NumPy passes
+that are max-combined into the height map in place, skipping the cells a
+feature provably cannot raise. The per-element arithmetic is the same as
+the original loops, so a fixed seed still gives the same height map.
+"""
+import numpy as np
+
+from instrumentation import instrumented
+
+# Upper bound on the number of float64 elements in one work block (32 MB)
+CHUNK_ELEMENTS = 2**22
+
+# Natural log of 2**-1100: feature values below this are exactly 0.0
+_LOG_ZERO = -1100 * np.log(2)
+# Relative slack (in log space) when comparing against the height map floor,
+# many orders of magnitude above the rounding error of exp/pow
+_LOG_MARGIN = 1e-6
+
+
+def _randint(rng, low, high):
+    """randint for both numpy.random.Generator and the legacy RandomState API."""
+    if isinstance(rng, np.random.Generator):
+        return rng.integers(low, high)
+    return rng.randint(low, high)
+
+
+def _randn(rng, size):
+    """randn for both numpy.random.Generator and the legacy RandomState API."""
+    if isinstance(rng, np.random.Generator):
+        return rng.standard_normal(size)
+    return rng.randn(size)
+
+
+def _block_shape(n_rows, n_cols, n_features, chunk_elements):
+    """Pick (rows per block, features per chunk) so one block fits the budget."""
+    rows_per_block = max(1, min(n_rows, chunk_elements // max(n_cols, 1)))
+    features_per_chunk = max(1, min(n_features, chunk_elements // (rows_per_block * n_cols)))
+    return rows_per_block, features_per_chunk
+
+
+def _as_arrays(features, keys):
+    """Convert the listed feature fields to float64 column arrays."""
+    return [np.asarray(features[key], dtype=float)[:, None, None] for key in keys]
+
+
+def _log_cutoff(height, steepness, floor):
+    """
+    Exponent ``-r**2 / sigma`` below which a radial feature cannot raise the map.
+
+    Below it ``(height * exp(-r**2 / sigma))**steepness`` is either under
+    2**-1100, which every libm rounds to exactly 0.0, or (with a small safety
+    margin) under ``floor``, the current minimum of the height map.
+    """
+    log_floor = _LOG_ZERO
+    if floor > 0:
+        log_floor = max(log_floor, np.log(floor) - _LOG_MARGIN)
+    return log_floor / steepness - np.log(height)
+
+
+@instrumented()
+def stamp_radial_features(height_map, x, y, features, cutoff_sigmas=None,
+                          chunk_elements=CHUNK_ELEMENTS):
+    """
+    Max-combine radial features into the height map in place.
+
+    Feature k is ``height * exp(-r**2 / sigma)``, raised to ``steepness``
+    when that field is present, with r the distance to (x, y). This is the
+    shape shared by ridge points, minor peaks, stones and boulders.
+
+    Each feature is only evaluated inside the disk where it can exceed the
+    current minimum of the height map, and cells of the bounding window
+    outside that disk are masked out of the exp/pow passes (which are also
+    very slow on subnormals). Both are exact: a skipped cell could not have
+    changed the maximum.
+
+    With ``cutoff_sigmas`` the window is further clipped to that many
+    standard deviations (``sqrt(sigma / 2)``) around each center. Cells
+    outside it are left untouched even if the feature has not fully decayed
+    there, so the cost follows the number of features rather than features
+    times grid area, at the price of bit-for-bit parity.
+
+    Parameters:
+    -----------
+    height_map : numpy.ndarray
+        Non-negative (len(y), len(x)) array, updated in place
+    x, y : numpy.ndarray
+        Ascending column and row coordinates of the grid
+    features : dict
+        Sequences 'x', 'y', 'height', 'sigma' and optionally 'steepness',
+        one entry per feature
+    cutoff_sigmas : float or None
+        Optional support radius in standard deviations of each feature
+    chunk_elements : int
+        Maximum number of elements in one work block
+
+    Returns:
+    --------
+    height_map : numpy.ndarray
+        The updated height map
+    """
+    if len(features['x']) == 0:
+        return height_map
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    has_steepness = 'steepness' in features
+    # The map only grows, so its current minimum stays a valid floor
+    floor = float(height_map.min())
+
+    for k in range(len(features['x'])):
+        cx = float(features['x'][k])
+        cy = float(features['y'][k])
+        height = float(features['height'][k])
+        sigma = float(features['sigma'][k])
+        steepness = float(features['steepness'][k]) if has_steepness else 1.0
+
+        # Bounding window of the live disk, with a little slack for rounding
+        log_cutoff = _log_cutoff(height, steepness, floor)
+        radius = np.sqrt(max(-log_cutoff * sigma, 0.0)) * (1 + 1e-6)
+        if cutoff_sigmas is not None:
+            radius = min(radius, cutoff_sigmas * np.sqrt(sigma / 2))
+        c0, c1 = np.searchsorted(x, [cx - radius, cx + radius])
+        r0, r1 = np.searchsorted(y, [cy - radius, cy + radius])
+        if c0 >= c1 or r0 >= r1:
+            continue
+
+        dx2 = (x[c0:c1] - cx)**2
+        rows_per_block = max(1, chunk_elements // (c1 - c0))
+
+        for b0 in range(r0, r1, rows_per_block):
+            b1 = min(b0 + rows_per_block, r1)
+            window = height_map[b0:b1, c0:c1]
+
+            # Same operation order as the original per-feature expression
+            block = dx2 + ((y[b0:b1] - cy)**2)[:, None]
+            np.sqrt(block, out=block)
+            np.square(block, out=block)
+            np.negative(block, out=block)
+            block /= sigma
+            live = block >= log_cutoff
+            np.exp(block, out=block, where=live)
+            np.multiply(height, block, out=block, where=live)
+            if has_steepness:
+                np.power(block, steepness, out=block, where=live)
+
+            np.maximum(window, block, out=window, where=live)
+
+    return height_map
+
+
+@instrumented()
+def stamp_elliptic_features(height_map, x, y, features, chunk_elements=CHUNK_ELEMENTS):
+    """
+    Max-combine rotated elliptical peaks into the height map in place.
+
+    Feature k is ``height * exp(-r**steepness)``, where r is the distance to
+    (x, y) in a frame rotated by ``rotation`` and scaled by ``sigma_x`` and
+    ``sigma_y``. This is the shape of the secondary peaks.
+
+    Parameters:
+    -----------
+    height_map : numpy.ndarray
+        (len(y), len(x)) array, updated in place
+    x, y : numpy.ndarray
+        Column and row coordinates of the grid
+    features : dict
+        Sequences 'x', 'y', 'height', 'sigma_x', 'sigma_y', 'rotation' and
+        'steepness', one entry per feature
+    chunk_elements : int
+        Maximum number of elements in one work block
+
+    Returns:
+    --------
+    height_map : numpy.ndarray
+        The updated height map
+    """
+    n_features = len(features['x'])
+    if n_features == 0:
+        return height_map
+
+    cx, cy, height, sigma_x, sigma_y, steepness = _as_arrays(
+        features, ['x', 'y', 'height', 'sigma_x', 'sigma_y', 'steepness'])
+    # Scalar cos/sin per feature, exactly as the original loop computed them
+    cos_rot = np.array([np.cos(rot) for rot in features['rotation']], dtype=float)[:, None, None]
+    sin_rot = np.array([np.sin(rot) for rot in features['rotation']], dtype=float)[:, None, None]
+    x = np.asarray(x, dtype=float)[None, None, :]
+    y = np.asarray(y, dtype=float)[None, :, None]
+
+    n_rows, n_cols = height_map.shape
+    rows_per_block, per_chunk = _block_shape(n_rows, n_cols, n_features, chunk_elements)
+
+    for k0 in range(0, n_features, per_chunk):
+        k = slice(k0, k0 + per_chunk)
+        dx = x - cx[k]
+
+        for r0 in range(0, n_rows, rows_per_block):
+            r1 = min(r0 + rows_per_block, n_rows)
+            dy = y[:, r0:r1] - cy[k]
+
+            dx_rot = dx * cos_rot[k] - dy * sin_rot[k]
+            dy_rot = dx * sin_rot[k] + dy * cos_rot[k]
+            dx_rot /= sigma_x[k]
+            dy_rot /= sigma_y[k]
+
+            block = np.square(dx_rot, out=dx_rot)
+            block += np.square(dy_rot, out=dy_rot)
+            np.sqrt(block, out=block)
+            np.power(block, steepness[k], out=block)
+            np.negative(block, out=block)
+            np.exp(block, out=block)
+            block *= height[k]
+
+            np.maximum(height_map[r0:r1], block.max(axis=0), out=height_map[r0:r1])
+
+    return height_map
+
+
+# Every knob of the generator, as (low, high) sampling ranges unless noted.
+# Integer counts are drawn from [low, high) like randint. The defaults are
+# the values the generator has always used.
+MOUNTAIN_PARAMETERS = {
+    # 1. Central mountain
+    'center_offset': 0.2,           # peak within +-offset of the origin
+    'peak_sigma': (0.5, 0.7),
+    'warp_strength': (0.05, 0.15),
+    'warp_freq': (1.0, 2.0),
+    'peak_steepness': (1.8, 2.5),
+    # 2. Secondary peaks and ridges
+    'secondary_peaks': (3, 6),
+    'secondary_distance': (0.5, 1.2),
+    'secondary_height': (0.3, 0.5),
+    'secondary_sigma': (0.2, 0.4),
+    'secondary_steepness': (1.8, 2.5),
+    'ridges': (2, 4),
+    'ridge_length': (0.8, 1.5),
+    'ridge_points': (4, 6),
+    'ridge_meander': 0.15,          # std dev of the control point jitter
+    'ridge_height': (0.6, 0.2),     # from the peak to the end (not sampled)
+    'ridge_width': (0.1, 0.15),
+    # 3. Minor peaks
+    'minor_peaks': (5, 10),
+    'minor_distance': (0.8, 2.0),
+    'minor_height': (0.15, 0.3),
+    'minor_sigma': (0.05, 0.2),
+    'minor_steepness': (1.5, 3.0),
+    # 4. Stones
+    'stones': (15, 25),
+    'stone_distance': (0.2, 2.3),
+    'stone_height': (0.05, 0.15),
+    'stone_sigma': (0.02, 0.08),
+    'stone_steepness': (2.0, 4.0),
+    # 5. Boulder fields
+    'boulder_fields': (3, 6),
+    'boulder_field_distance': (0.5, 1.8),
+    'boulders_per_field': (5, 10),
+    'boulder_spread': 0.2,          # boulders within +-spread of the field
+    'boulder_height': (0.04, 0.1),
+    'boulder_sigma': (0.01, 0.05),
+    'boulder_steepness': (2.5, 3.5),
+    # 6-7. Surface texture, borders and scale
+    'texture_layers': 3,
+    'texture_amplitude': 0.05,      # amplitude of the first noise layer
+    'texture_strength': 0.4,
+    'border_start': 2.5,            # falloff from |x| or |y| = start ...
+    'border_width': 0.5,            # ... to start + width
+    'max_height': (12, 16),
+}
+
+
+def mountain_parameters(**overrides):
+    """Copy of MOUNTAIN_PARAMETERS with some values replaced."""
+    unknown = set(overrides) - set(MOUNTAIN_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown mountain parameters: {', '.join(sorted(unknown))}")
+    params = dict(MOUNTAIN_PARAMETERS)
+    params.update(overrides)
+    return params
+
+
+@instrumented()
+def sample_mountain_features(rng=None, params=None):
+    """
+    Draw the parameters of every mountain feature.
+
+    The draws happen in the same order as the original inline loops of
+    generate_detailed_mountain, so a given seed reproduces the same terrain.
+
+    Parameters:
+    -----------
+    rng : numpy.random.Generator, numpy.random.RandomState or None
+        Source of randomness; None draws from the global NumPy state
+    params : dict or None
+        Sampling ranges (see MOUNTAIN_PARAMETERS); None uses the defaults
+
+    Returns:
+    --------
+    features : dict
+        'main_peak' parameters plus one stamp_* feature dict per kind:
+        'secondary_peaks', 'ridge_points', 'minor_peaks', 'stones' and
+        'boulders'
+    """
+    if rng is None:
+        rng = np.random
+    params = mountain_parameters(**(params or {}))
+    
+    # ---------------------------------------------------------
+    # 1. Central mountain
+    # ---------------------------------------------------------
+    
+    # Use more central coordinates for the main peak
+    center_x = rng.uniform(-params['center_offset'], params['center_offset'])
+    center_y = rng.uniform(-params['center_offset'], params['center_offset'])
+    main_peak = {
+        'x': center_x,
+        'y': center_y,
+        # Create asymmetric shape for dramatic appearance
+        'sigma_x': rng.uniform(*params['peak_sigma']),
+        'sigma_y': rng.uniform(*params['peak_sigma']),
+        # Add slight rotation for natural asymmetry
+        'rotation': rng.uniform(0, 2*np.pi),
+        # Add subtle directional warping for natural look
+        'warp_strength': rng.uniform(*params['warp_strength']),
+        'warp_freq_x': rng.uniform(*params['warp_freq']),
+        'warp_freq_y': rng.uniform(*params['warp_freq']),
+        # Dramatic steepness
+        'steepness': rng.uniform(*params['peak_steepness']),
+    }
+    
+    # ---------------------------------------------------------
+    # 2. Secondary features (smaller peaks, ridges)
+    # ---------------------------------------------------------
+    
+    # Add several smaller peaks around the main one
+    num_secondary_peaks = _randint(rng, *params['secondary_peaks'])
+    secondary_peaks = {'x': [], 'y': [], 'height': [], 'sigma_x': [], 'sigma_y': [],
+                       'rotation': [], 'steepness': []}
+    
+    for _ in range(num_secondary_peaks):
+        # Position relative to main peak and away from borders
+        angle = rng.uniform(0, 2*np.pi)
+        distance = rng.uniform(*params['secondary_distance'])
+        
+        peak_x = center_x + distance * np.cos(angle)
+        peak_y = center_y + distance * np.sin(angle)
+        
+        # Ensure the peak isn't too close to borders
+        if abs(peak_x) > 2.0 or abs(peak_y) > 2.0:
+            continue
+        
+        secondary_peaks['x'].append(peak_x)
+        secondary_peaks['y'].append(peak_y)
+        # Smaller heights than main peak
+        secondary_peaks['height'].append(rng.uniform(*params['secondary_height']))
+        # Varied shapes
+        secondary_peaks['sigma_x'].append(rng.uniform(*params['secondary_sigma']))
+        secondary_peaks['sigma_y'].append(rng.uniform(*params['secondary_sigma']))
+        secondary_peaks['rotation'].append(rng.uniform(0, 2*np.pi))
+        secondary_peaks['steepness'].append(rng.uniform(*params['secondary_steepness']))
+    
+    # Add ridge lines connecting to main peak
+    num_ridges = _randint(rng, *params['ridges'])
+    ridge_points = {'x': [], 'y': [], 'height': [], 'sigma': []}
+    
+    for _ in range(num_ridges):
+        # Start from central peak
+        start_x = center_x
+        start_y = center_y
+        
+        # Extend in random direction
+        angle = rng.uniform(0, 2*np.pi)
+        length = rng.uniform(*params['ridge_length'])
+        
+        end_x = start_x + length * np.cos(angle)
+        end_y = start_y + length * np.sin(angle)
+        
+        # Ensure endpoint is within safe area
+        if abs(end_x) > 2.0 or abs(end_y) > 2.0:
+            # Adjust end point to stay within bounds
+            if abs(end_x) > 2.0:
+                factor = 1.8 / abs(end_x)
+                end_x *= factor
+                end_y *= factor
+            if abs(end_y) > 2.0:
+                factor = 1.8 / abs(end_y)
+                end_x *= factor
+                end_y *= factor
+        
+        # Create a ridge with multiple points
+        num_points = _randint(rng, *params['ridge_points'])
+        
+        # Add some meandering to the ridge path
+        control_x = np.linspace(start_x, end_x, num_points)
+        control_y = np.linspace(start_y, end_y, num_points)
+        
+        # Add random variation but keep first point fixed at peak
+        control_x[1:] += params['ridge_meander'] * _randn(rng, num_points-1)
+        control_y[1:] += params['ridge_meander'] * _randn(rng, num_points-1)
+        
+        # Height decreases along ridge
+        ridge_heights = np.linspace(*params['ridge_height'], num_points)
+        ridge_width = rng.uniform(*params['ridge_width'])
+        
+        # Skip the first point as it's already covered by main peak
+        ridge_points['x'].extend(control_x[1:])
+        ridge_points['y'].extend(control_y[1:])
+        ridge_points['height'].extend(ridge_heights[1:])
+        ridge_points['sigma'].extend([ridge_width] * (num_points - 1))
+    
+    # ---------------------------------------------------------
+    # 3. Minor peaks scattered around the mountain
+    # ---------------------------------------------------------
+    
+    num_minor_peaks = _randint(rng, *params['minor_peaks'])
+    minor_peaks = {'x': [], 'y': [], 'height': [], 'sigma': [], 'steepness': []}
+    
+    for _ in range(num_minor_peaks):
+        # Position these at intermediate distances from center
+        angle = rng.uniform(0, 2*np.pi)
+        # Distance varies - some closer to main peak, some further out
+        distance = rng.uniform(*params['minor_distance'])
+        
+        peak_x = center_x + distance * np.cos(angle)
+        peak_y = center_y + distance * np.sin(angle)
+        
+        # Ensure the peak isn't too close to borders
+        if abs(peak_x) > 2.0 or abs(peak_y) > 2.0:
+            continue
+        
+        minor_peaks['x'].append(peak_x)
+        minor_peaks['y'].append(peak_y)
+        # These peaks are smaller than secondary peaks
+        minor_peaks['height'].append(rng.uniform(*params['minor_height']))
+        # More varied shapes - some sharper, some more gradual
+        minor_peaks['sigma'].append(rng.uniform(*params['minor_sigma']))
+        minor_peaks['steepness'].append(rng.uniform(*params['minor_steepness']))
+    
+    # ---------------------------------------------------------
+    # 4. Isolated stones/rocks scattered across the terrain
+    # ---------------------------------------------------------
+    
+    num_stones = _randint(rng, *params['stones'])
+    stones = {'x': [], 'y': [], 'height': [], 'sigma': [], 'steepness': []}
+    
+    for _ in range(num_stones):
+        # Scatter these more widely, but keep away from borders
+        angle = rng.uniform(0, 2*np.pi)
+        distance = rng.uniform(*params['stone_distance'])
+        
+        stone_x = center_x + distance * np.cos(angle)
+        stone_y = center_y + distance * np.sin(angle)
+        
+        # Safety check for borders
+        if abs(stone_x) > 2.2 or abs(stone_y) > 2.2:
+            continue
+        
+        stones['x'].append(stone_x)
+        stones['y'].append(stone_y)
+        # These are much smaller than minor peaks
+        stones['height'].append(rng.uniform(*params['stone_height']))
+        # Stones are small and sharp
+        stones['sigma'].append(rng.uniform(*params['stone_sigma']))
+        stones['steepness'].append(rng.uniform(*params['stone_steepness']))
+    
+    # ---------------------------------------------------------
+    # 5. Boulder fields (clusters of small rocks)
+    # ---------------------------------------------------------
+    
+    num_boulder_fields = _randint(rng, *params['boulder_fields'])
+    boulders = {'x': [], 'y': [], 'height': [], 'sigma': [], 'steepness': []}
+    
+    for _ in range(num_boulder_fields):
+        # Position boulder fields at various distances
+        angle = rng.uniform(0, 2*np.pi)
+        distance = rng.uniform(*params['boulder_field_distance'])
+        
+        field_center_x = center_x + distance * np.cos(angle)
+        field_center_y = center_y + distance * np.sin(angle)
+        
+        # Safety check for borders
+        if abs(field_center_x) > 2.0 or abs(field_center_y) > 2.0:
+            continue
+        
+        # Create a handful of boulders in this field
+        num_boulders = _randint(rng, *params['boulders_per_field'])
+        
+        for i in range(num_boulders):
+            # Position randomly within the field
+            boulder_x = field_center_x + rng.uniform(-params['boulder_spread'], params['boulder_spread'])
+            boulder_y = field_center_y + rng.uniform(-params['boulder_spread'], params['boulder_spread'])
+            
+            # Safety check again
+            if abs(boulder_x) > 2.2 or abs(boulder_y) > 2.2:
+                continue
+            
+            boulders['x'].append(boulder_x)
+            boulders['y'].append(boulder_y)
+            # Small height
+            boulders['height'].append(rng.uniform(*params['boulder_height']))
+            # Very small radius
+            boulders['sigma'].append(rng.uniform(*params['boulder_sigma']))
+            boulders['steepness'].append(rng.uniform(*params['boulder_steepness']))
+    
+    return {
+        'main_peak': main_peak,
+        'secondary_peaks': secondary_peaks,
+        'ridge_points': ridge_points,
+        'minor_peaks': minor_peaks,
+        'stones': stones,
+        'boulders': boulders,
+    }
+
+
+@instrumented()
+def stamp_main_peak(height_map, x, y, main_peak):
+    """
+    Max-combine the warped, rotated central peak into the height map in place.
+
+    Parameters:
+    -----------
+    height_map : numpy.ndarray
+        (len(y), len(x)) array, updated in place
+    x, y : numpy.ndarray
+        Column and row coordinates of the grid
+    main_peak : dict
+        Parameters from sample_mountain_features
+
+    Returns:
+    --------
+    height_map : numpy.ndarray
+        The updated height map
+    """
+    rotation = main_peak['rotation']
+    dx = np.asarray(x, dtype=float)[None, :] - main_peak['x']
+    dy = np.asarray(y, dtype=float)[:, None] - main_peak['y']
+    dx_rot = dx * np.cos(rotation) - dy * np.sin(rotation)
+    dy_rot = dx * np.sin(rotation) + dy * np.cos(rotation)
+    
+    # Create asymmetric distance field
+    r = np.sqrt((dx_rot/main_peak['sigma_x'])**2 + (dy_rot/main_peak['sigma_y'])**2)
+    
+    # Add subtle directional warping for natural look
+    warp = (main_peak['warp_strength'] * np.sin(main_peak['warp_freq_x'] * dx_rot)
+            * np.cos(main_peak['warp_freq_y'] * dy_rot))
+    r += warp * np.clip(1.0 - r, 0, 1)
+    
+    # Create main peak with dramatic steepness
+    main_peak_height = 1.0
+    peak = main_peak_height * np.exp(-r**main_peak['steepness'])
+    
+    # Ensure peak has a slightly sharper top
+    sharp_factor = 1.2
+    peak = np.power(peak, sharp_factor)
+    
+    np.maximum(height_map, peak, out=height_map)
+    return height_map
+
+
+@instrumented()
+def stamp_mountain_features(height_map, x, y, features, window_sigmas=None,
+                            chunk_elements=CHUNK_ELEMENTS):
+    """
+    Stamp every sampled feature into the height map in place.
+
+    This is sections 1-5 of generate_detailed_mountain. It only depends on
+    the coordinates passed in, so it can be run on any block of rows.
+
+    Parameters:
+    -----------
+    height_map : numpy.ndarray
+        Zero-initialised (len(y), len(x)) array, updated in place
+    x, y : numpy.ndarray
+        Ascending column and row coordinates of the grid
+    features : dict
+        Output of sample_mountain_features
+    window_sigmas : float or None
+        Optional support cutoff for stones and boulders, see
+        stamp_radial_features
+    chunk_elements : int
+        Maximum number of elements in one work block
+
+    Returns:
+    --------
+    height_map : numpy.ndarray
+        The updated height map
+    """
+    stamp_main_peak(height_map, x, y, features['main_peak'])
+    stamp_elliptic_features(height_map, x, y, features['secondary_peaks'],
+                            chunk_elements=chunk_elements)
+    stamp_radial_features(height_map, x, y, features['ridge_points'],
+                          chunk_elements=chunk_elements)
+    stamp_radial_features(height_map, x, y, features['minor_peaks'],
+                          chunk_elements=chunk_elements)
+    stamp_radial_features(height_map, x, y, features['stones'],
+                          cutoff_sigmas=window_sigmas, chunk_elements=chunk_elements)
+    stamp_radial_features(height_map, x, y, features['boulders'],
+                          cutoff_sigmas=window_sigmas, chunk_elements=chunk_elements)
+    return height_map
@@ -0,0 +1,185 @@
+"""
+Mountain height map generation.
+
+generate_detailed_mountain is shared by mountain_generator.py (Y-up Godot
+exports) and make_heightmap.py (Z-up exports), which used to carry a copy
+each. The height map itself does not depend on the export layout, so both
+scripts import it from here, and cached maps are keyed on this module and
+mountain_features alone, not on the exporters.
+"""
+import random
+import time
+
+import numpy as np
+
+from instrumentation import instrumented, stage
+from mountain_features import mountain_parameters, sample_mountain_features, stamp_mountain_features
+from mountain_tiles import generate_mountain_tiles
+from terrain_cache import cache_key, cached_array
+
+
+@instrumented()
+def generate_detailed_mountain(grid_size=40, force_random=True, window_sigmas=None,
+                               output_file='detailed_mountain_data.npy', tile_rows=None, rng=None, cache=False,
+                               features=None, params=None):
+    """
+    Generate a mountain with a prominent central peak, clean borders,
+    and additional minor peaks and isolated stones for visual interest.
+    
+    Parameters:
+    -----------
+    grid_size : int
+        Resolution of the grid
+    force_random : bool
+        Whether to force randomness by using current time as seed
+    window_sigmas : float or None
+        If given, stones and boulders are only evaluated within this many
+        standard deviations of their centre (4-6 is plenty). Much faster at
+        high resolution, but no longer bit-identical to the full evaluation
+    output_file : str or None
+        Where to save the raw height data (.npy); None skips saving
+    tile_rows : int or None
+        If given, generate the map out of core in strips of this many rows,
+        written straight into a memory-mapped output_file. The result is
+        bit-identical to the in-memory path
+    rng : numpy.random.Generator or None
+        Explicit source of randomness. When given, force_random is ignored
+        and the global NumPy state is left untouched
+    cache : bool
+        Reuse the map stored for the same rng state, parameters and code
+        (see terrain_cache); needs rng and in-memory generation. A hit
+        leaves rng in the state the generation would have left it in
+    features : dict or None
+        Features from sample_mountain_features; None samples them from rng
+    params : dict or None
+        Generator knobs (see mountain_features.MOUNTAIN_PARAMETERS); None
+        uses the defaults. A whole run can also be described by a spec,
+        see mountain_spec
+    
+    Returns:
+    --------
+    height_map : numpy.ndarray
+        2D array of the height data (a read-only memmap in tiled mode)
+    """
+    # Reuse a map generated from the same RNG state by the same code
+    if cache:
+        if not hasattr(rng, 'bit_generator') or tile_rows is not None:
+            raise ValueError("Caching needs an explicit rng and in-memory generation")
+        key = cache_key('heightmap', {'rng': rng.bit_generator.state, 'grid_size': grid_size,
+                                      'window_sigmas': window_sigmas, 'features': features,
+                                      'params': params},
+                        modules=(__name__, 'mountain_features'))
+        height_map = cached_array(key, lambda: generate_detailed_mountain(
+            grid_size, window_sigmas=window_sigmas, output_file=None, rng=rng,
+            features=features, params=params), rng=rng)
+        if output_file is not None:
+            np.save(output_file, height_map)
+        return height_map
+    
+    # Force randomness by using current time as seed
+    if rng is None and force_random:
+        current_time = int(time.time() * 1000) % 10000
+        np.random.seed(current_time)
+        random.seed(current_time + 1)
+        print(f"Using random seed: {current_time}")
+    
+    # Sample every feature first; the texture noise below continues from
+    # the same global RNG stream
+    if rng is None:
+        rng = np.random
+    if features is None:
+        features = sample_mountain_features(rng, params)
+    params = mountain_parameters(**(params or {}))
+    
+    if tile_rows is not None:
+        if output_file is None:
+            raise ValueError("Tiled generation needs an output_file to map")
+        return generate_mountain_tiles(grid_size, features, output_file, tile_rows=tile_rows,
+                                       window_sigmas=window_sigmas, rng=rng, params=params)
+    
+    # Create grid
+    x = np.linspace(-3, 3, grid_size)
+    y = np.linspace(-3, 3, grid_size)
+    xx, yy = np.meshgrid(x, y)
+    
+    # Initialize height map
+    height_map = np.zeros((grid_size, grid_size))
+    
+    # ---------------------------------------------------------
+    # 1-5. Central mountain, secondary peaks, ridges, minor peaks,
+    #      stones and boulder fields
+    # ---------------------------------------------------------
+    
+    stamp_mountain_features(height_map, x, y, features, window_sigmas)
+    
+    # ---------------------------------------------------------
+    # 6. Add surface details
+    # ---------------------------------------------------------
+    
+    # Create multi-scale texture (scipy is imported here, not at module
+    # level, so exports and cache hits start without it)
+    texture_layers = params['texture_layers']
+    with stage('texture filter', layers=texture_layers):
+        from scipy.ndimage import gaussian_filter
+        
+        texture = np.zeros_like(height_map)
+    
+        for i in range(texture_layers):
+            freq = 2**i
+            amp = params['texture_amplitude'] * (0.5**i)
+        
+            noise_layer = amp * rng.random((grid_size, grid_size))
+            noise_layer = gaussian_filter(noise_layer, sigma=1.0/(freq*0.6))
+            texture += noise_layer
+    
+    with stage('texture mask'):
+        # Create a mask that fades out toward the borders
+        border_distance = np.maximum(
+            np.abs(xx / 3), np.abs(yy / 3)
+        )
+    
+        # Create smooth falloff from center to borders
+        texture_mask = np.clip(1.0 - border_distance**2, 0, 1)
+    
+        # Apply texture with height-dependent intensity and border mask
+        gradient_x, gradient_y = np.gradient(height_map)
+        slope = np.sqrt(gradient_x**2 + gradient_y**2)
+        slope_factor = np.clip(slope / 0.5, 0, 1)
+    
+        # Apply texture primarily to slopes and fade out near borders
+        height_map += texture * slope_factor * params['texture_strength'] * texture_mask
+    
+    # ---------------------------------------------------------
+    # 7. Ensure clean borders with explicit falloff
+    # ---------------------------------------------------------
+    
+    with stage('border mask'):
+        # Create a stronger border falloff mask
+        border_factor = 0.8
+        edge_distance = np.maximum(
+            (np.abs(xx) - params['border_start']) / params['border_width'],
+            (np.abs(yy) - params['border_start']) / params['border_width']
+        )
+    
+        # Create a smooth falloff that's 1 in the center region and 0 at borders
+        border_mask = np.clip(1.0 - edge_distance, 0, 1)
+    
+        # Apply border mask to entire height map
+        height_map = height_map * border_mask
+    
+        # Double-check that borders are exactly zero
+        margin = 2  # pixels
+        height_map[0:margin, :] = 0
+        height_map[-margin:, :] = 0
+        height_map[:, 0:margin] = 0
+        height_map[:, -margin:] = 0
+    
+    # Scale heights for better visualization
+    max_height = rng.uniform(*params['max_height'])
+    height_map = height_map * max_height
+    
+    # Save the raw data
+    if output_file is not None:
+        np.save(output_file, height_map)
+    
+    return height_map
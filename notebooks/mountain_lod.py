@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Mountain Levels of Detail
+
+Derives coarser versions of a high-resolution height map by pooling
+blocks of factor x factor cells, and exports every level as a histogram
+mesh, so far views render a small fraction of the columns. Max pooling
+keeps every peak at its full height and the silhouette intact; mean
+pooling keeps the volume instead.
+
+Coarse cells cover exactly the fine cells they pool, so all levels share
+the same footprint. Levels are welded column meshes (see
+mesh_export.column_mesh): the bars-with-gaps layout is tied to the fine
+grid spacing.
+
+Usage:
+    python mountain_lod.py detailed_mountain_data.npy --factors 1 2 4 8
+    python mountain_lod.py detailed_mountain_data.npy --mode mean --format obj --greedy
+"""
+import argparse
+
+import numpy as np
+
+from heightmap_format import load_heightmap
+from instrumentation import instrumented
+from mesh_export import column_mesh, grid_cell_edges, write_glb_lods, write_obj_vertices, write_obj_faces
+
+
+def pool_heights(height_map, factor, mode='max'):
+    """
+    Pool blocks of factor x factor cells into one.
+
+    Blocks at the far edges may be smaller when the map size is not a
+    multiple of the factor; their mean is over the cells they contain.
+    """
+    if mode not in ('max', 'mean'):
+        raise ValueError(f"Unknown pooling mode: {mode}")
+    height_map = np.asarray(height_map, dtype=np.float64)
+    if factor == 1:
+        return height_map.copy()
+
+    n_rows, n_cols = height_map.shape
+    rows, cols = -(-n_rows // factor), -(-n_cols // factor)
+    padded = np.zeros((rows * factor, cols * factor))
+    padded[:n_rows, :n_cols] = height_map
+    blocks = padded.reshape(rows, factor, cols, factor)
+    if mode == 'max':
+        return blocks.max(axis=(1, 3))
+
+    counts = np.zeros_like(padded)
+    counts[:n_rows, :n_cols] = 1
+    return blocks.sum(axis=(1, 3)) / counts.reshape(rows, factor, cols, factor).sum(axis=(1, 3))
+
+
+@instrumented()
+def lod_levels(height_map, factors=(1, 2, 4, 8), mode='max', threshold=0.05):
+    """
+    Pooled height maps with their cell boundaries.
+
+    Cells below the threshold are cleared before pooling, as the histogram
+    exporters skip them, and pooled cells below it are cleared again.
+
+    Returns:
+    --------
+    levels : list of dict
+        Per factor: 'factor', 'heights' and the 'x_edges' and 'z_edges' of
+        its cells in the generator's [-3, 3] grid
+    """
+    height_map = np.asarray(height_map, dtype=np.float64)
+    heights = np.where(height_map < threshold, 0.0, height_map)
+    n_rows, n_cols = heights.shape
+    x_edges, z_edges = grid_cell_edges(n_cols), grid_cell_edges(n_rows)
+
+    levels = []
+    for factor in factors:
+        pooled = pool_heights(heights, factor, mode)
+        pooled[pooled < threshold] = 0.0
+        levels.append({
+            'factor': factor,
+            'heights': pooled,
+            'x_edges': x_edges[np.minimum(np.arange(pooled.shape[1] + 1) * factor, n_cols)],
+            'z_edges': z_edges[np.minimum(np.arange(pooled.shape[0] + 1) * factor, n_rows)],
+        })
+    return levels
+
+
+def lod_meshes(height_map, factors=(1, 2, 4, 8), mode='max', threshold=0.05, y_up=True, greedy=False):
+    """Column mesh (vertices, faces) of every level, finest first (see lod_levels)."""
+    return [column_mesh(level['heights'], level['x_edges'], level['z_edges'], y_up=y_up, greedy=greedy)
+            for level in lod_levels(height_map, factors, mode, threshold)]
+
+
+@instrumented()
+def export_lods(height_map, prefix='mountain_lod', factors=(1, 2, 4, 8), mode='max', threshold=0.05,
+                file_format='glb', greedy=False):
+    """
+    Export every level of detail for Godot (Y-up).
+
+    GLB writes <prefix>.glb with one node per level (see
+    mesh_export.write_glb_lods); OBJ writes <prefix><k>.obj per level.
+
+    Returns:
+    --------
+    meshes : list of tuple
+        (vertices, faces) of every level
+    """
+    meshes = lod_meshes(height_map, factors, mode, threshold, y_up=True, greedy=greedy)
+
+    if file_format == 'glb':
+        write_glb_lods(f"{prefix}.glb", meshes)
+        print(f"Godot-compatible LOD GLB file saved as {prefix}.glb")
+        return meshes
+
+    for k, ((vertices, faces), factor) in enumerate(zip(meshes, factors)):
+        filename = f"{prefix}{k}.obj"
+        with open(filename, 'wb') as f:
+            f.write(b"# Mountain Histogram OBJ file for Godot (Y-up coordinate system)\n")
+            f.write(f"# Level of detail {k}: {factor}x{factor} cells per column ({mode})\n".encode())
+            write_obj_vertices(f, vertices)
+            write_obj_faces(f, faces)
+        print(f"Godot-compatible LOD OBJ file saved as {filename}")
+    return meshes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export levels of detail of a mountain height map")
+    parser.add_argument('input', help="height map (.npy or .hmap) saved by the generator")
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="cells pooled per column side, one per level")
+    parser.add_argument('--mode', choices=['max', 'mean'], default='max')
+    parser.add_argument('--threshold', type=float, default=0.05)
+    parser.add_argument('--greedy', action='store_true',
+                        help="merge coplanar faces into rectangles")
+    parser.add_argument('--format', choices=['obj', 'glb'], default='glb')
+    parser.add_argument('--prefix', default='mountain_lod')
+    args = parser.parse_args()
+
+    height_map = load_heightmap(args.input)
+    meshes = export_lods(height_map, args.prefix, args.factors, args.mode, args.threshold,
+                         args.format, args.greedy)
+    for factor, (vertices, faces) in zip(args.factors, meshes):
+        print(f"  {factor}x{factor}: {len(vertices)} vertices, {len(faces)} faces")
@@ -1,165 +1,134 @@
 import re
 import math
+import argparse
 
-def parse_obj(filename):
+import numpy as np
+
+import mesh_export
+from instrumentation import instrumented
+from mesh_partition import (analyze_grid, clip_grid, grid_region_codes, ground_axes, is_closed, partition_mesh,
+                            stitch_seams)
+from obj_io import read_obj, face_array, face_lists
+from terrain_cache import cache_key, cached_files, file_digest
+
+@instrumented()
+def parse_obj(filename, cache=True):
     """Parse OBJ file and return vertices and faces."""
-    vertices = []
-    faces = []
-    
-    with open(filename, 'r') as file:
-        for line in file:
-            line = line.strip()
-            if line.startswith('v '):
-                # Parse vertex line
-                parts = line.split()
-                x, y, z = float(parts[1]), float(parts[2]), float(parts[3])
-                vertices.append((x, y, z))
-            elif line.startswith('f '):
-                # Parse face line
-                parts = line.split()
-                # Extract only the vertex indices (before any /)
-                face = []
-                for p in parts[1:]:
-                    # Split by / and take only the first value (vertex index)
-                    vertex_index = p.split('/')[0]
-                    face.append(int(vertex_index) - 1)  # Convert 1-indexed to 0-indexed
-                faces.append(face)
-    
-    return vertices, faces
+    # Shared chunked reader (with its parse cache unless cache is False);
+    # float64 keeps the values exactly as written
+    vertices, faces = read_obj(filename, dtype=np.float64, cache=cache)
+    return list(map(tuple, vertices.tolist())), face_lists(faces)
 
-def find_highest_point_and_tile(vertices):
-    """Find the highest point and determine the nearest grid tile."""
-    # Find highest point
-    max_y = -float('inf')
-    highest_vertex = None
-    highest_idx = None
-    
-    for idx, (x, y, z) in enumerate(vertices):
-        if y > max_y:
-            max_y = y
-            highest_vertex = (x, y, z)
-            highest_idx = idx
-    
-    # The data shows a 40x40 grid pattern
-    # Find the grid size based on vertex positions
-    x_positions = sorted(list(set(x for x, _, _ in vertices)))
-    z_positions = sorted(list(set(z for _, _, z in vertices)))
-    
-    grid_spacing_x = x_positions[1] - x_positions[0] if len(x_positions) > 1 else 0.123076923076923
-    grid_spacing_z = z_positions[1] - z_positions[0] if len(z_positions) > 1 else 0.123076923076923
+@instrumented()
+def find_highest_point_and_tile(vertices, up_axis=1):
+    """
+    Find the highest point and determine the nearest grid tile.
+
+    ``up_axis`` is the axis of the heights: 1 for Godot's Y-up meshes (the
+    original layout), 2 for Z-up exports, or None to detect it (see
+    mesh_partition.detect_up_axis). The split point is given on the two
+    other axes, in order.
+    """
+    # Peak and grid lines in a few vectorized passes (see
+    # mesh_partition.analyze_grid), robust to jittered coordinates
+    grid = analyze_grid(vertices, up_axis)
+    highest_vertex = tuple(grid['peak'].tolist())
     
     # Find the nearest grid corner to the highest point
-    hx, hz = highest_vertex[0], highest_vertex[2]
-    corner_x = round(hx / grid_spacing_x) * grid_spacing_x
-    corner_z = round(hz / grid_spacing_z) * grid_spacing_z
-    
-    return highest_vertex, (corner_x, corner_z)
+    vertex_array = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    corner = []
+    for axis, spacing, origin in zip(grid['axes'], grid['spacing'], grid['origin']):
+        value = highest_vertex[axis]
+        if spacing > 0:
+            value = origin + round((value - origin) / spacing) * spacing
+            # Use the coordinate of the grid line itself, so faces on the
+            # line lie exactly in the split plane
+            nearest = vertex_array[np.argmin(np.abs(vertex_array[:, axis] - value)), axis]
+            if abs(nearest - value) <= 1e-6 * spacing:
+                value = float(nearest)
+        corner.append(value)
+    
+    return highest_vertex, tuple(corner)
 
-def split_into_quadrants(vertices, faces, split_point):
-    """Split vertices and faces into 4 quadrants based on split point."""
+# Quadrant names in the order of the 2 x 2 grid regions
+QUADRANTS = ('sw', 'se', 'nw', 'ne')
+
+def split_into_quadrant_arrays(vertices, faces, split_point, clip=False, axes=None, up_axis=1):
+    """
+    NumPy core of split_into_quadrants: a 2 x 2 grid partition through the
+    split point (see mesh_partition.partition_mesh for the region layout).
+    With clip, faces crossing a split line are cut at it instead of dropped.
+    The split point is given on the ground ``axes``; if None they are the
+    two axes other than ``up_axis`` (x and z by default, None detects the
+    up axis), like in find_highest_point_and_tile.
+    """
     split_x, split_z = split_point
-    
-    # Create quadrant structures
-    quadrants = {
-        'sw': {'vertices': [], 'faces': [], 'vertex_map': {}},  # x < 0, z < 0
-        'se': {'vertices': [], 'faces': [], 'vertex_map': {}},  # x > 0, z < 0
-        'nw': {'vertices': [], 'faces': [], 'vertex_map': {}},  # x < 0, z > 0
-        'ne': {'vertices': [], 'faces': [], 'vertex_map': {}}   # x > 0, z > 0
-    }
-    
-    # Classify vertices into quadrants
-    for idx, (x, y, z) in enumerate(vertices):
-        # Determine which quadrant this vertex belongs to
-        if x <= split_x and z <= split_z:
-            quad = 'sw'
-        elif x > split_x and z <= split_z:
-            quad = 'se'
-        elif x <= split_x and z > split_z:
-            quad = 'nw'
-        else:  # x > split_x and z > split_z
-            quad = 'ne'
-        
-        # Add vertex to appropriate quadrant
-        new_idx = len(quadrants[quad]['vertices'])
-        quadrants[quad]['vertices'].append((x, y, z))
-        quadrants[quad]['vertex_map'][idx] = new_idx
-    
-    # Distribute faces to quadrants
-    for face in faces:
-        # Determine which quadrant this face belongs to
-        # A face belongs to a quadrant if ANY of its vertices are in that quadrant
-        for quad_name, quad_data in quadrants.items():
-            face_vertices = []
-            all_in_quadrant = True
-            
-            for v_idx in face:
-                if v_idx in quad_data['vertex_map']:
-                    face_vertices.append(quad_data['vertex_map'][v_idx])
-                else:
-                    all_in_quadrant = False
-                    break
-            
-            if all_in_quadrant:
-                quadrants[quad_name]['faces'].append(face_vertices)
-                break
+    vertex_array = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if axes is None:
+        axes = ground_axes(vertex_array, up_axis)
+    if clip:
+        return dict(zip(QUADRANTS, clip_grid(vertex_array, faces, [split_x], [split_z], axes=axes)))
+    codes = grid_region_codes(vertex_array, [split_x], [split_z], axes)
+    return dict(zip(QUADRANTS, partition_mesh(vertex_array, faces, codes, len(QUADRANTS))))
+
+@instrumented()
+def split_into_quadrants(vertices, faces, split_point, clip=False, axes=None, up_axis=1):
+    """Split vertices and faces into 4 quadrants based on split point."""
+    quadrants = {}
+    for name, data in split_into_quadrant_arrays(vertices, faces, split_point, clip, axes, up_axis).items():
+        quad_faces, sizes = data['faces'], data['sizes']
+        if np.all(sizes == quad_faces.shape[1]):
+            quad_faces = quad_faces.tolist()
+        else:
+            quad_faces = [face[:size] for face, size in zip(quad_faces.tolist(), sizes.tolist())]
+        members = data['vertex_ids']
+        quadrants[name] = {
+            'vertices': list(map(tuple, data['vertices'].tolist())),
+            'faces': quad_faces,
+            # Vertices created by clipping have no input index
+            'vertex_map': {idx: new_idx for new_idx, idx in enumerate(members.tolist()) if idx >= 0},
+        }
     
     return quadrants
 
-def fill_sides(quadrants, split_point):
-    """Add edges and faces to fill the sides where quadrants were split."""
+@instrumented()
+def fill_sides(quadrants, split_point, axes=None, up_axis=1):
+    """
+    Add side walls where the quadrants were split, so every quadrant is a
+    closed mesh again.
+
+    Expects quadrants split with clip=True (faces cut at the split lines,
+    nothing dropped); the openings along both split lines are then closed
+    by mesh_partition.stitch_seams, which also splits mesh edges where a
+    wall needs a vertex. The ground ``axes`` default to the axes other
+    than ``up_axis`` as in split_into_quadrants; with up_axis None it is
+    detected from all quadrants together.
+    """
     split_x, split_z = split_point
-    
-    # Function to find vertices on the split boundaries
-    def vertices_on_boundary(vertices, axis, value, tolerance=1e-6):
-        """Find vertices that lie on the boundary."""
-        boundary_vertices = []
-        for idx, vertex in enumerate(vertices):
-            if axis == 'x' and abs(vertex[0] - value) < tolerance:
-                boundary_vertices.append((idx, vertex))
-            elif axis == 'z' and abs(vertex[2] - value) < tolerance:
-                boundary_vertices.append((idx, vertex))
-        return boundary_vertices
-    
-    # Collect boundary vertices for each quadrant
-    boundaries = {}
+    if axes is None:
+        vertices = None
+        if up_axis is None:
+            vertices = np.concatenate([np.asarray(data['vertices'], dtype=np.float64).reshape(-1, 3)
+                                       for data in quadrants.values()])
+        axes = ground_axes(vertices, up_axis)
+    planes = [(axes[0], split_x), (axes[1], split_z)]
     
     for quad_name, quad_data in quadrants.items():
-        boundaries[quad_name] = {
-            'edge_x': vertices_on_boundary(quad_data['vertices'], 'x', split_x),
-            'edge_z': vertices_on_boundary(quad_data['vertices'], 'z', split_z)
-        }
-    
-    # Create faces to connect adjacent quadrants
-    def create_connecting_face(v1, v2, v3, v4):
-        """Create a quad face connecting the boundary vertices."""
-        return [v1, v2, v3, v4]
-    
-    # Connect quadrants
-    # SW to SE connection (along z = split_z)
-    if boundaries['sw']['edge_z'] and boundaries['se']['edge_z']:
-        sw_edge_z = sorted(boundaries['sw']['edge_z'], key=lambda x: x[1][0])
-        se_edge_z = sorted(boundaries['se']['edge_z'], key=lambda x: x[1][0])
+        vertices = np.asarray(quad_data['vertices'], dtype=np.float64).reshape(-1, 3)
+        faces, sizes = face_array(quad_data['faces'])
+        vertex_ids = np.full(len(vertices), -1)
+        vertex_ids[list(quad_data['vertex_map'].values())] = list(quad_data['vertex_map'].keys())
+        region = {'vertices': vertices, 'faces': faces, 'sizes': sizes, 'vertex_ids': vertex_ids}
+        stitched = stitch_seams(region, planes)
         
-        for i in range(min(len(sw_edge_z) - 1, len(se_edge_z) - 1)):
-            # Create vertical face
-            sw_bottom = sw_edge_z[i][0]
-            sw_top = sw_edge_z[i + 1][0]
-            se_bottom = se_edge_z[i][0]
-            se_top = se_edge_z[i + 1][0]
-            
-            # Add face to both quadrants
-            face = create_connecting_face(sw_bottom, se_bottom, se_top, sw_top)
-            quadrants['sw']['faces'].append(face)
-            quadrants['se']['faces'].append(face)
-    
-    # Similar connections for other boundaries...
-    # This is a simplified version. For complete implementation, you'd need:
-    # 1. NW to NE connection (along z = split_z)
-    # 2. SW to NW connection (along x = split_x)
-    # 3. SE to NE connection (along x = split_x)
+        # Existing vertices keep their indices, walls only append
+        quad_data['vertices'] = list(map(tuple, stitched['vertices'].tolist()))
+        quad_data['faces'] = [face[:size] for face, size in
+                              zip(stitched['faces'].tolist(), stitched['sizes'].tolist())]
     
     return quadrants
 
+@instrumented()
 def write_obj(filename, vertices, faces):
     """Write vertices and faces to OBJ file."""
     with open(filename, 'w') as file:
@@ -177,29 +146,61 @@ def write_obj(filename, vertices, faces):
             indices = " ".join(str(idx + 1) for idx in face)
             file.write(f"f {indices}\n")
 
-def main():
-    # Parse input OBJ
+def write_glb(filename, vertices, faces):
+    """Write vertices and faces to a binary glTF (.glb) file."""
+    mesh_export.write_glb(filename, (vertices, faces))
+
+@instrumented()
+def write_quadrants_glb(filename, quadrants):
+    """Write all quadrants to one .glb file, one mesh primitive per quadrant."""
+    parts = {name: (data['vertices'], data['faces'])
+             for name, data in quadrants.items() if data['faces']}
+    mesh_export.write_glb(filename, parts)
+
+def main(cache=False, up_axis=None):
     input_file = "normalized_histogram_mountain.obj"
+    
+    # Reuse the outputs stored for the same input and code (see terrain_cache)
+    if cache:
+        outputs = [f"mountain_quadrant_{name}.obj" for name in QUADRANTS] + ["mountain_quadrants.glb"]
+        key = cache_key('quadrants', {'input': file_digest(input_file), 'up_axis': up_axis},
+                        modules=(__name__, 'mesh_partition', 'mesh_export', 'obj_io'))
+        if cached_files(key, outputs, lambda: main(up_axis=up_axis)):
+            print("Restored the quadrant files from cache")
+        return
+    
+    # Parse input OBJ
     vertices, faces = parse_obj(input_file)
     
     print(f"Loaded {len(vertices)} vertices and {len(faces)} faces")
     
     # Find highest point and split point
-    highest_point, split_point = find_highest_point_and_tile(vertices)
+    highest_point, split_point = find_highest_point_and_tile(vertices, up_axis)
     print(f"Highest point: {highest_point}")
     print(f"Split point: {split_point}")
     
-    # Split into quadrants
-    quadrants = split_into_quadrants(vertices, faces, split_point)
+    # Split into quadrants, cutting the bars on the split lines
+    quadrants = split_into_quadrants(vertices, faces, split_point, clip=True, up_axis=up_axis)
     
-    # Fill sides (simplified version)
-    quadrants = fill_sides(quadrants, split_point)
+    # Close every quadrant with side walls along the split lines
+    quadrants = fill_sides(quadrants, split_point, up_axis=up_axis)
     
     # Write output files
     for quad_name, quad_data in quadrants.items():
         output_file = f"mountain_quadrant_{quad_name}.obj"
         write_obj(output_file, quad_data['vertices'], quad_data['faces'])
-        print(f"Wrote {quad_name}: {len(quad_data['vertices'])} vertices, {len(quad_data['faces'])} faces")
+        closed = "closed" if is_closed(quad_data['faces']) else "open"
+        print(f"Wrote {quad_name}: {len(quad_data['vertices'])} vertices, {len(quad_data['faces'])} faces ({closed})")
+    
+    # All quadrants in one binary file for Godot
+    write_quadrants_glb("mountain_quadrants.glb", quadrants)
+    print("Wrote mountain_quadrants.glb")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split the mountain into closed quadrant meshes")
+    parser.add_argument('--cache', action='store_true', help="reuse outputs of an identical earlier run")
+    parser.add_argument('--up-axis', choices=['x', 'y', 'z', 'auto'], default='auto',
+                        help="axis of the heights: y for Godot exports, z for Z-up ones "
+                             "(default: detected from the mesh)")
+    args = parser.parse_args()
+    main(cache=args.cache, up_axis=None if args.up_axis == 'auto' else 'xyz'.index(args.up_axis))
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Serializable mountain specs.
+
+A spec holds everything that determines a generated height map: grid
+size, the generator knobs (mountain_features.MOUNTAIN_PARAMETERS), the
+sampled features and the state of the random stream the texture noise is
+drawn from afterwards. It is plain JSON, so it can be sampled once, saved,
+hashed, cached and replayed, or handed to a worker process, and the map it
+describes never depends on global random state.
+
+A spec sampled from a seed generates the same map as
+generate_detailed_mountain(rng=numpy.random.default_rng(seed)).
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from mountain_features import mountain_parameters, sample_mountain_features
+
+SPEC_VERSION = 1
+
+
+def _plain(value):
+    """JSON-compatible copy (tuples become lists, NumPy scalars floats)."""
+    return json.loads(json.dumps(value, default=lambda item: np.asarray(item).tolist()))
+
+
+def sample_spec(seed=None, grid_size=40, params=None, window_sigmas=None):
+    """
+    Draw the features of a mountain into a spec.
+
+    Parameters:
+    -----------
+    seed : int or None
+        Seed of the numpy.random.Generator the features and texture noise
+        come from; None draws fresh entropy (recorded in the spec)
+    grid_size : int
+        Resolution of the grid
+    params : dict or None
+        Overrides of MOUNTAIN_PARAMETERS
+    window_sigmas : float or None
+        Support cutoff for stones and boulders (see generate_detailed_mountain)
+
+    Returns:
+    --------
+    spec : dict
+        JSON-compatible description of the mountain
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    params = mountain_parameters(**(params or {}))
+    rng = np.random.default_rng(seed)
+    features = sample_mountain_features(rng, params)
+    return _plain({
+        'version': SPEC_VERSION,
+        'seed': seed,
+        'grid_size': grid_size,
+        'window_sigmas': window_sigmas,
+        'params': params,
+        'features': features,
+        'noise_state': rng.bit_generator.state,
+    })
+
+
+def spec_rng(spec):
+    """A fresh Generator at the stream position the spec's texture noise starts from."""
+    bit_generator = getattr(np.random, spec['noise_state']['bit_generator'])()
+    bit_generator.state = spec['noise_state']
+    return np.random.Generator(bit_generator)
+
+
+def spec_digest(spec):
+    """Content hash of a spec."""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def save_spec(spec, filename):
+    """Write a spec as JSON."""
+    with open(filename, 'w') as f:
+        json.dump(spec, f, indent=2)
+
+
+def load_spec(filename):
+    """Read a spec written by save_spec."""
+    with open(filename) as f:
+        spec = json.load(f)
+    if spec.get('version') != SPEC_VERSION:
+        raise ValueError(f"Unsupported spec version: {spec.get('version')}")
+    return spec
+
+
+def generate_from_spec(spec, output_file=None, tile_rows=None, cache=False):
+    """
+    Generate the height map a spec describes.
+
+    Parameters:
+    -----------
+    spec : dict
+        Output of sample_spec or load_spec
+    output_file : str or None
+        Where to save the height data (.npy); None skips saving
+    tile_rows : int or None
+        Generate out of core in strips of this many rows
+    cache : bool
+        Reuse a stored map of the same spec (see terrain_cache)
+
+    Returns:
+    --------
+    height_map : numpy.ndarray
+        2D array of the height data
+    """
+    # Imported here so processes that only sample specs skip the generator
+    from mountain_heightmap import generate_detailed_mountain
+
+    return generate_detailed_mountain(grid_size=spec['grid_size'], window_sigmas=spec['window_sigmas'],
+                                      output_file=output_file, tile_rows=tile_rows, rng=spec_rng(spec),
+                                      cache=cache, features=spec['features'], params=spec['params'])
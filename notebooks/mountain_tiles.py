@@ -0,0 +1,187 @@
+"""
+Tiled, out-of-core generation of the detailed mountain height map.
+
+generate_detailed_mountain holds the whole grid in memory together with a
+dozen same-sized temporaries. generate_mountain_tiles produces the same map
+one strip of rows at a time, straight into a memory-mapped .npy file, so
+peak memory is bounded by the tile size instead of the grid size.
+
+Every step is evaluated exactly as in the monolithic path. Features are
+pointwise, the texture noise is replayed from the same RNG stream, and the
+gaussian_filter and np.gradient passes get enough halo rows that the strips
+agree with the full-grid result to the last bit.
+"""
+import numpy as np
+
+from instrumentation import instrumented
+from mountain_features import mountain_parameters, stamp_mountain_features
+
+# Default truncate of scipy.ndimage.gaussian_filter
+GAUSSIAN_TRUNCATE = 4.0
+
+
+def _clone_rng(rng):
+    """Independent copy of a Generator, a RandomState or the global NumPy state."""
+    if isinstance(rng, np.random.Generator):
+        bit_generator = type(rng.bit_generator)()
+        bit_generator.state = rng.bit_generator.state
+        return np.random.Generator(bit_generator)
+    clone = np.random.RandomState()
+    clone.set_state(rng.get_state())
+    return clone
+
+
+def _restore_rng(rng, source):
+    """Move ``rng`` to the stream position of ``source`` (a clone of it)."""
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = source.bit_generator.state
+    else:
+        rng.set_state(source.get_state())
+
+
+class _NoiseRows:
+    """Sequential reader over the rows of one texture noise layer."""
+
+    def __init__(self, rng, n_cols, amp):
+        self.rng = rng
+        self.n_cols = n_cols
+        self.amp = amp
+        self.rows = np.empty((0, n_cols))
+        self.start = 0
+
+    def take(self, lo, hi):
+        """Return rows [lo, hi); both bounds must not decrease between calls."""
+        self.rows = self.rows[lo - self.start:]
+        self.start = lo
+        missing = hi - lo - len(self.rows)
+        if missing > 0:
+            fresh = self.amp * self.rng.random((missing, self.n_cols))
+            self.rows = np.concatenate([self.rows, fresh])
+        return self.rows[:hi - lo]
+
+
+def _skip_samples(rng, count, chunk):
+    """Advance an RNG past ``count`` uniform float draws."""
+    while count > 0:
+        step = min(count, chunk)
+        rng.random(step)
+        count -= step
+
+
+@instrumented()
+def generate_mountain_tiles(grid_size, features, filename='detailed_mountain_data.npy',
+                            tile_rows=256, window_sigmas=None, rng=None, params=None):
+    """
+    Generate the detailed mountain strip by strip into a memory-mapped file.
+
+    The result is bit-identical to the in-memory path of
+    generate_detailed_mountain for the same features and RNG state. Like
+    that path, the texture noise and the final height scale are drawn from
+    ``rng`` after the features, and ``rng`` is left in the same state
+    afterwards.
+
+    Parameters:
+    -----------
+    grid_size : int
+        Resolution of the grid
+    features : dict
+        Output of sample_mountain_features, drawn right before this call
+    filename : str
+        Output .npy file, written through a memory map
+    tile_rows : int
+        Number of grid rows evaluated at once; memory use scales with
+        tile_rows * grid_size
+    window_sigmas : float or None
+        Optional support cutoff for stones and boulders
+    rng : numpy.random.Generator, numpy.random.RandomState or None
+        The generator the features were drawn from; None uses the global
+        NumPy state
+    params : dict or None
+        Texture, border and scale knobs (see MOUNTAIN_PARAMETERS)
+
+    Returns:
+    --------
+    height_map : numpy.memmap
+        Read-only view of the generated height map
+    """
+    from scipy.ndimage import gaussian_filter
+
+    x = np.linspace(-3, 3, grid_size)
+    y = np.linspace(-3, 3, grid_size)
+    skip_chunk = max(tile_rows, 1) * grid_size
+
+    # The monolithic path draws the three noise layers as full grids one
+    # after another, then max_height. Find where each layer starts in the
+    # stream by skipping ahead, without keeping any of the samples.
+    if rng is None:
+        rng = np.random
+    params = mountain_parameters(**(params or {}))
+    walker = _clone_rng(rng)
+    layers = []
+    for i in range(params['texture_layers']):
+        freq = 2**i
+        amp = params['texture_amplitude'] * (0.5**i)
+        sigma = 1.0/(freq*0.6)
+        halo = int(GAUSSIAN_TRUNCATE * sigma + 0.5)
+        layers.append((_NoiseRows(_clone_rng(walker), grid_size, amp), sigma, halo))
+        _skip_samples(walker, grid_size * grid_size, skip_chunk)
+
+    _restore_rng(rng, walker)
+    max_height = rng.uniform(*params['max_height'])
+
+    # Write the .npy header, then map one tile at a time so written pages
+    # don't pile up in the resident set
+    height_map = np.lib.format.open_memmap(filename, mode='w+', dtype=np.float64,
+                                           shape=(grid_size, grid_size))
+    data_offset = height_map.offset
+    itemsize = height_map.itemsize
+    del height_map
+    margin = 2  # pixels
+
+    for r0 in range(0, grid_size, tile_rows):
+        r1 = min(r0 + tile_rows, grid_size)
+
+        # Features with one halo row on each side for np.gradient
+        g0, g1 = max(r0 - 1, 0), min(r1 + 1, grid_size)
+        block = np.zeros((g1 - g0, grid_size))
+        stamp_mountain_features(block, x, y[g0:g1], features, window_sigmas)
+
+        gradient_x, gradient_y = np.gradient(block)
+        gradient_x = gradient_x[r0 - g0:r1 - g0]
+        gradient_y = gradient_y[r0 - g0:r1 - g0]
+        slope = np.sqrt(gradient_x**2 + gradient_y**2)
+        slope_factor = np.clip(slope / 0.5, 0, 1)
+
+        # Multi-scale texture, each layer filtered with its own halo
+        texture = np.zeros((r1 - r0, grid_size))
+        for noise_rows, sigma, halo in layers:
+            lo, hi = max(r0 - halo, 0), min(r1 + halo, grid_size)
+            noise_layer = gaussian_filter(noise_rows.take(lo, hi), sigma=sigma)
+            texture += noise_layer[r0 - lo:r1 - lo]
+
+        xs = x[None, :]
+        ys = y[r0:r1, None]
+        border_distance = np.maximum(np.abs(xs / 3), np.abs(ys / 3))
+        texture_mask = np.clip(1.0 - border_distance**2, 0, 1)
+
+        tile = block[r0 - g0:r1 - g0]
+        tile += texture * slope_factor * params['texture_strength'] * texture_mask
+
+        start, width = params['border_start'], params['border_width']
+        edge_distance = np.maximum((np.abs(xs) - start) / width, (np.abs(ys) - start) / width)
+        border_mask = np.clip(1.0 - edge_distance, 0, 1)
+        tile = tile * border_mask
+
+        rows = np.arange(r0, r1)
+        tile[(rows < margin) | (rows >= grid_size - margin), :] = 0
+        tile[:, 0:margin] = 0
+        tile[:, -margin:] = 0
+
+        out = np.memmap(filename, dtype=np.float64, mode='r+',
+                        offset=data_offset + r0 * grid_size * itemsize,
+                        shape=(r1 - r0, grid_size))
+        out[:] = tile * max_height
+        out.flush()
+        del out
+
+    return np.load(filename, mmap_mode='r')
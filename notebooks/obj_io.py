@@ -0,0 +1,281 @@
+"""
+Shared Wavefront OBJ reader for the mountain scripts.
+
+The old readers went through the file line by line with strip/split/float
+and built Python lists of tuples, about ten times the file size in memory.
+read_obj memory-maps the file, parses large blocks of it at once with NumPy
+and fills contiguous arrays allocated at their final size, so peak memory
+stays close to the size of the result. The result is cached in an .npz
+under terrain_cache.CACHE_DIR, keyed by path, modification time and size,
+so reading the same mountain again skips parsing entirely without writing
+anything next to the input (which may be read-only or checked in).
+"""
+import hashlib
+import itertools
+import mmap
+import os
+import zipfile
+
+import numpy as np
+
+import terrain_cache
+from instrumentation import instrumented
+
+# Bytes parsed per block; bounds the temporary buffers
+CHUNK_BYTES = 2**22
+
+_SPACE = np.zeros(256, dtype=bool)
+_SPACE[[ord(' '), ord('\t'), ord('\r'), ord('\n')]] = True
+
+
+def _scan_chunk(buf):
+    """
+    Locate the ``v`` and ``f`` lines of a block of whole lines.
+
+    Returns the block with the keywords blanked out, its whitespace mask,
+    the line lengths, the vertex and face line masks and the number of
+    whitespace-separated tokens on every line.
+    """
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate([[0], newlines[:-1] + 1])
+
+    # The keyword is the first character after any indentation; a blank
+    # line gets its own newline
+    keyword = starts.copy()
+    indented = np.flatnonzero(_SPACE[buf[starts]])
+    if len(indented):
+        filled = np.append(np.flatnonzero(~_SPACE[buf]), len(buf) - 1)
+        keyword[indented] = np.minimum(filled[np.searchsorted(filled, starts[indented])], newlines[indented])
+    second = buf[np.minimum(keyword + 1, len(buf) - 1)]
+    is_vertex = (buf[keyword] == ord('v')) & _SPACE[second]
+    is_face = (buf[keyword] == ord('f')) & _SPACE[second]
+
+    # Blank out the keywords, then count whitespace-separated tokens per line
+    buf = buf.copy()
+    buf[keyword[is_vertex | is_face]] = ord(' ')
+    space = _SPACE[buf]
+    token_start = ~space
+    token_start[1:] &= space[:-1]
+    tokens = np.add.reduceat(token_start, starts)
+    line_length = np.diff(np.append(starts, len(buf)))
+    return buf, space, line_length, is_vertex, is_face, tokens
+
+
+def _parse_chunk(scan, vertex_base):
+    """
+    Parse the ``v`` and ``f`` lines of a scanned block.
+
+    Parameters:
+    -----------
+    scan : tuple
+        Output of _scan_chunk
+    vertex_base : int
+        Vertices read before this block, for relative (negative) indices
+
+    Returns:
+    --------
+    vertices : numpy.ndarray
+        (n, 3) float64 positions
+    indices : numpy.ndarray
+        Zero-based vertex indices of all faces, concatenated
+    """
+    buf, space, line_length, is_vertex, is_face, tokens = scan
+
+    # Vertices: x y z, ignoring an optional w or vertex colour
+    counts = tokens[is_vertex]
+    values = np.fromstring(buf[np.repeat(is_vertex, line_length)].tobytes(), sep=' ')
+    if len(counts) and counts.min() < 3:
+        raise ValueError("Vertex line with fewer than 3 coordinates")
+    if np.all(counts == 3):
+        vertices = values.reshape(-1, 3)
+    else:
+        first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        vertices = values[first[:, None] + np.arange(3)]
+
+    # Faces: keep the vertex index of each v/vt/vn token
+    keep = np.repeat(is_face, line_length)
+    slash = buf == ord('/')
+    if slash.any():
+        position = np.arange(len(buf), dtype=np.int32)
+        last_slash = np.maximum.accumulate(np.where(slash, position, -1))
+        last_space = np.maximum.accumulate(np.where(space, position, -1))
+        keep &= last_slash < last_space
+    indices = np.fromstring(buf[keep].tobytes(), dtype=np.int64, sep=' ')
+
+    # Positive indices are 1-based, negative ones count back from the
+    # vertices read so far
+    seen = vertex_base + np.cumsum(is_vertex)[is_face]
+    indices = np.where(indices < 0, indices + np.repeat(seen, tokens[is_face]), indices - 1)
+    return vertices, indices
+
+
+def _chunks(data):
+    """Split a byte buffer into blocks of whole lines of about CHUNK_BYTES."""
+    start = 0
+    while start < len(data):
+        stop = min(start + CHUNK_BYTES, len(data))
+        if stop < len(data):
+            cut = data.rfind(b"\n", start, stop)
+            stop = cut + 1 if cut >= 0 else data.find(b"\n", stop) + 1 or len(data)
+        yield start, stop
+        start = stop
+
+
+def _block(data, start, stop):
+    """Zero-copy view of data[start:stop] ending with a newline."""
+    block = np.frombuffer(data, dtype=np.uint8, count=stop - start, offset=start)
+    if block[-1] != ord('\n'):
+        block = np.append(block, np.uint8(ord('\n')))
+    return block
+
+
+def _release(data, start, stop):
+    """Drop the mapped pages of a parsed block from the resident set."""
+    if hasattr(mmap, 'MADV_DONTNEED'):
+        aligned = start - start % mmap.PAGESIZE
+        data.madvise(mmap.MADV_DONTNEED, aligned, stop - aligned)
+
+
+def _parse_file(filename, dtype=np.float64):
+    """
+    Parse a whole OBJ file through a memory map.
+
+    A first pass over the mapped file counts the vertex lines and face
+    sizes of every block, so the output arrays are allocated once at their
+    final size. The second pass parses each block straight into them.
+    Besides the outputs only one block's temporaries (and mapped pages)
+    are resident at a time, and no per-line Python objects are created.
+    """
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.empty((0, 3), dtype=dtype), pad_faces(np.empty(0), np.empty(0))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            blocks = list(_chunks(data))
+
+            # Pass 1: line ranges and sizes
+            vertex_counts, face_sizes = [], []
+            for start, stop in blocks:
+                _, _, _, is_vertex, is_face, tokens = _scan_chunk(_block(data, start, stop))
+                vertex_counts.append(int(is_vertex.sum()))
+                face_sizes.append(tokens[is_face].astype(np.int32))
+                _release(data, start, stop)
+            sizes = np.concatenate(face_sizes)
+
+            # Pass 2: parse into the preallocated arrays
+            vertices = np.empty((sum(vertex_counts), 3), dtype=dtype)
+            indices = np.empty(int(sizes.sum()), dtype=np.int32)
+            vertex_at = index_at = 0
+            for (start, stop), count in zip(blocks, vertex_counts):
+                v, i = _parse_chunk(_scan_chunk(_block(data, start, stop)), vertex_at)
+                vertices[vertex_at:vertex_at + count] = v
+                indices[index_at:index_at + len(i)] = i
+                vertex_at += count
+                index_at += len(i)
+                del v, i
+                _release(data, start, stop)
+
+    return vertices, pad_faces(indices, sizes)
+
+
+def pad_faces(indices, sizes):
+    """
+    Faces as one (m, k) array, k being the largest face size.
+
+    Smaller faces are padded at the end with -1.
+    """
+    if len(sizes) == 0:
+        return np.empty((0, 3), dtype=np.int32)
+    width = int(sizes.max())
+    if np.all(sizes == width):
+        return indices.reshape(-1, width).astype(np.int32, copy=False)
+
+    faces = np.full((len(sizes), width), -1, dtype=np.int32)
+    row = np.repeat(np.arange(len(sizes)), sizes)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    faces[row, np.arange(len(indices)) - np.repeat(offsets, sizes)] = indices
+    return faces
+
+
+def cache_path(filename):
+    """Location of the parse cache of an OBJ file, one per absolute path."""
+    name = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()
+    return os.path.join(terrain_cache.CACHE_DIR, 'obj', f"{name}.npz")
+
+
+@instrumented()
+def read_obj(filename, dtype=np.float32, cache=True):
+    """
+    Read the vertices and faces of an OBJ file into NumPy arrays.
+
+    Texture coordinates and normals are skipped; face tokens may be written
+    as v, v/vt, v//vn or v/vt/vn, and negative (relative) indices are
+    resolved.
+
+    Parameters:
+    -----------
+    filename : str
+        OBJ file to read
+    dtype : numpy dtype
+        Vertex dtype; float64 keeps the exact values written in the file
+    cache : bool
+        Use and refresh the .npz parse cache of the file (see cache_path)
+
+    Returns:
+    --------
+    vertices : numpy.ndarray
+        (n, 3) vertex positions
+    faces : numpy.ndarray
+        (m, k) int32 zero-based vertex indices, rows of smaller faces
+        padded with -1
+    """
+    stat = os.stat(filename)
+    key = np.array([os.path.abspath(filename), str(stat.st_mtime_ns), str(stat.st_size)])
+    cached = cache_path(filename)
+
+    if cache and os.path.exists(cached):
+        try:
+            with np.load(cached) as data:
+                # A float32 cache can't serve a float64 read
+                if (data['key'].tolist() == key.tolist()
+                        and data['vertices'].dtype.itemsize >= np.dtype(dtype).itemsize):
+                    return data['vertices'].astype(dtype, copy=False), data['faces']
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+
+    vertices, faces = _parse_file(filename, dtype)
+
+    if cache:
+        try:
+            # Write under a temporary name so a crash never leaves a broken cache
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            temporary = f"{cached}.tmp.npz"
+            np.savez(temporary, key=key, vertices=vertices, faces=faces)
+            os.replace(temporary, cached)
+        except OSError:
+            pass
+
+    return vertices, faces
+
+
+def face_array(faces):
+    """
+    Faces given as an (m, k) array or a ragged list, as an (m, k) int64
+    array padded with -1 plus the size of every face.
+
+    The sizes tell padding apart from real negative indices in ragged input.
+    """
+    if isinstance(faces, np.ndarray):
+        faces = faces.astype(np.int64, copy=False).reshape(len(faces), -1)
+        return faces, (faces >= 0).sum(axis=1)
+    sizes = np.fromiter(map(len, faces), dtype=np.int64, count=len(faces))
+    indices = np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int64, count=int(sizes.sum()))
+    padded = np.full((len(faces), int(sizes.max()) if len(faces) else 0), -1, dtype=np.int64)
+    padded[np.arange(padded.shape[1]) < sizes[:, None]] = indices
+    return padded, sizes
+
+
+def face_lists(faces):
+    """Padded face array back to a list of index lists (parse_obj's format)."""
+    if faces.size and faces.min() < 0:
+        return [[index for index in face if index >= 0] for face in faces.tolist()]
+    return faces.tolist()
@@ -4,22 +4,15 @@ Godot-Friendly Histogram Generator
 
 Creates a histogram OBJ file with connected columns (no gaps).
 """
+import numpy as np
 
-def fix_histogram_for_godot(input_file="Histogram_Columns_quadrant_neg_X_neg_Y.obj", output_file="Mountain_godot_4.obj"):
-    # Read the file
-    vertices = []
-    faces = []
-    
-    with open(input_file, 'r') as f:
-        for line in f:
-            if line.startswith('v '):
-                parts = line.split()
-                x, y, z = float(parts[1]), float(parts[2]), float(parts[3])
-                vertices.append([x, y, z])
-            elif line.startswith('f '):
-                parts = line.split()
-                face = [int(p.split('/')[0]) for p in parts[1:]]
-                faces.append(face)
+from mesh_export import column_mesh, write_obj_vertices, write_obj_faces
+from obj_io import read_obj
+
+def fix_histogram_for_godot(input_file="Histogram_Columns_quadrant_neg_X_neg_Y.obj", output_file="Mountain_godot_4.obj",
+                            welded=False):
+    # Read the file (only the vertex positions are used)
+    vertices = read_obj(input_file, dtype=np.float64)[0].tolist()
     
     # Group vertices by their X,Z positions
     columns = {}
@@ -36,6 +29,10 @@ def fix_histogram_for_godot(input_file="Histogram_Columns_quadrant_neg_X_neg_Y.o
         columns[key]['vertices'].append(i)
         columns[key]['heights'].append(v[1])
     
+    if welded:
+        write_welded_columns(columns, grid_size, output_file)
+        return
+    
     # Create new OBJ with combined geometry
     # Group columns to stay within surface limits (max ~100 surfaces)
     
@@ -109,22 +106,44 @@ def fix_histogram_for_godot(input_file="Histogram_Columns_quadrant_neg_X_neg_Y.o
     print(f"Fixed {col_idx} columns combined into single mesh")
     print(f"Output saved to: {output_file}")
 
+def write_welded_columns(columns, grid_size, output_file):
+    """
+    Write the grouped columns as one welded mesh: neighbours share corner
+    vertices and hidden walls between touching columns are dropped.
+    """
+    keys = [pos for pos, data in columns.items() if data['heights'] and max(data['heights']) > 0]
+    if not keys:
+        # Nothing stands above the ground: an OBJ without geometry
+        with open(output_file, 'wb') as f:
+            f.write(b"# Histogram for Godot (welded columns)\n\n")
+            f.write(b"o Histogram_Combined\n")
+        print("Welded 0 columns, no geometry written")
+        print(f"Output saved to: {output_file}")
+        return
+    
+    ix = np.array([round(x / grid_size) for x, _ in keys], dtype=np.int64)
+    iz = np.array([round(z / grid_size) for _, z in keys], dtype=np.int64)
+    
+    # Lay the columns out on a grid of cells, one cell per grid step
+    heights = np.zeros((iz.max() - iz.min() + 1, ix.max() - ix.min() + 1))
+    heights[iz - iz.min(), ix - ix.min()] = [max(columns[pos]['heights']) for pos in keys]
+    x_edges = (ix.min() + np.arange(heights.shape[1] + 1) - 0.5) * grid_size
+    z_edges = (iz.min() + np.arange(heights.shape[0] + 1) - 0.5) * grid_size
+    vertices, faces = column_mesh(heights, x_edges, z_edges)
+    
+    with open(output_file, 'wb') as f:
+        f.write(b"# Histogram for Godot (welded columns)\n\n")
+        write_obj_vertices(f, vertices)
+        f.write(b"\no Histogram_Combined\n\n")
+        write_obj_faces(f, faces)
+    
+    print(f"Welded {len(keys)} columns into {len(vertices)} vertices and {len(faces)} faces")
+    print(f"Output saved to: {output_file}")
+
 # Alternative approach: Create multiple OBJ files to handle the limitation
 def create_multiple_obj_files(input_file="Histogram_Columns_quadrant_neg_X_neg_Y.obj", output_prefix="histogram_part"):
-    # Read the file
-    vertices = []
-    faces = []
-    
-    with open(input_file, 'r') as f:
-        for line in f:
-            if line.startswith('v '):
-                parts = line.split()
-                x, y, z = float(parts[1]), float(parts[2]), float(parts[3])
-                vertices.append([x, y, z])
-            elif line.startswith('f '):
-                parts = line.split()
-                face = [int(p.split('/')[0]) for p in parts[1:]]
-                faces.append(face)
+    # Read the file (only the vertex positions are used)
+    vertices = read_obj(input_file, dtype=np.float64)[0].tolist()
     
     # Group vertices by their X,Z positions
     columns = {}
@@ -0,0 +1,178 @@
+"""
+Content-addressed cache for generated height maps and exported meshes.
+
+Generation and export runs are often repeated with identical inputs. Each
+result is stored under a hash of everything that determines it: the kind
+of result, its parameters (seed or RNG state, grid size, exporter options,
+a digest of the input data) and the source code of the modules that
+compute it, so editing the generator invalidates its entries by itself.
+
+Entries are directories under CACHE_DIR. A hit refreshes the entry's
+modification time, and after every store the least recently used entries
+are evicted until the cache fits in its disk budget.
+
+Environment:
+    MOUNTAIN_CACHE_DIR      cache location (default ~/.cache/mountain)
+    MOUNTAIN_CACHE_BYTES    disk budget in bytes (default 2 GB)
+"""
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+CACHE_DIR = os.environ.get('MOUNTAIN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mountain'))
+CACHE_BYTES = int(os.environ.get('MOUNTAIN_CACHE_BYTES', 2 * 1024**3))
+
+
+def code_version(*module_names):
+    """Digest of the source files of the named modules."""
+    digest = hashlib.sha256()
+    for name in module_names:
+        with open(importlib.import_module(name).__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def array_digest(array):
+    """Digest of an array's shape, dtype and contents."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.shape}{array.dtype.str}".encode())
+    digest.update(array.data)
+    return digest.hexdigest()
+
+
+def file_digest(filename):
+    """Digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_value(value):
+    """JSON form of the arrays in parameters and RNG states."""
+    return np.asarray(value).tolist()
+
+
+def cache_key(kind, params, modules=()):
+    """
+    Key of a result: hash of its kind, its parameters (any JSON-able
+    values; arrays are listed) and the code version of ``modules``.
+    """
+    payload = json.dumps({'kind': kind, 'params': params, 'code': code_version(*modules)},
+                         sort_keys=True, default=_json_value)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _entry_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def evict(budget=None, directory=None, keep=None):
+    """
+    Remove least recently used entries until the cache fits in ``budget``
+    bytes, sparing the entry at path ``keep``.
+    """
+    budget = CACHE_BYTES if budget is None else budget
+    directory = CACHE_DIR if directory is None else directory
+    if not os.path.isdir(directory):
+        return
+
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and not name.startswith('.') and path != keep:
+            entries.append((os.path.getmtime(path), _entry_size(path), path))
+    total = sum(size for _, size, _ in entries) + (_entry_size(keep) if keep else 0)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def fetch(key, produce, budget=None, directory=None):
+    """
+    Directory of the cache entry ``key``, created by ``produce`` on a miss.
+
+    ``produce(path)`` writes the entry's files into an empty directory. It
+    is filled under a temporary name and renamed into place, so entries are
+    never seen half written.
+
+    Returns:
+    --------
+    path : str
+        Entry directory
+    hit : bool
+        Whether the entry already existed
+    """
+    directory = CACHE_DIR if directory is None else directory
+    path = os.path.join(directory, key)
+    if os.path.isdir(path):
+        os.utime(path)
+        return path, True
+
+    os.makedirs(directory, exist_ok=True)
+    temporary = tempfile.mkdtemp(prefix='.', dir=directory)
+    try:
+        produce(temporary)
+        os.replace(temporary, path)
+    except OSError:
+        # Another process stored the same entry first
+        if not os.path.isdir(path):
+            raise
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
+    evict(budget, directory, keep=path)
+    return path, False
+
+
+def cached_array(key, compute, rng=None):
+    """
+    Array stored under ``key``, computed by ``compute()`` on a miss.
+
+    If ``compute`` draws from the numpy.random.Generator ``rng``, pass it
+    along: the state it leaves rng in is stored with the array and restored
+    on a hit, so the caller's stream continues the same way either way.
+    """
+    def store(entry):
+        np.save(os.path.join(entry, 'array.npy'), compute())
+        if rng is not None:
+            with open(os.path.join(entry, 'rng.json'), 'w') as f:
+                json.dump(rng.bit_generator.state, f, default=_json_value)
+
+    path, hit = fetch(key, store)
+    if hit and rng is not None:
+        with open(os.path.join(path, 'rng.json')) as f:
+            rng.bit_generator.state = json.load(f)
+    return np.load(os.path.join(path, 'array.npy'))
+
+
+def cached_files(key, filenames, produce):
+    """
+    Make the files in ``filenames`` exist with the content stored under ``key``.
+
+    On a miss ``produce()`` writes them at their normal locations and they
+    are copied into the cache; on a hit they are copied out of it.
+
+    Returns:
+    --------
+    hit : bool
+        Whether the files came from the cache
+    """
+    def store(entry):
+        produce()
+        for k, filename in enumerate(filenames):
+            shutil.copyfile(filename, os.path.join(entry, f"{k}_{os.path.basename(filename)}"))
+
+    path, hit = fetch(key, store)
+    if hit:
+        for k, filename in enumerate(filenames):
+            shutil.copyfile(os.path.join(path, f"{k}_{os.path.basename(filename)}"), filename)
+    return hit
@@ -0,0 +1,37 @@
+"""
+Tests of the batch job layout.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import os
+
+import mountain_spec
+from batch_generate import make_jobs, run_job
+
+
+def test_one_job_per_seed_and_grid_size(tmp_path):
+    jobs = make_jobs([1, 2], grid_sizes=(16, 24), thresholds=(0.05, 0.1, 0.2), output_dir=str(tmp_path))
+    assert [(job['seed'], job['grid_size']) for job in jobs] == [(1, 16), (1, 24), (2, 16), (2, 24)]
+    for job in jobs:
+        assert [export['threshold'] for export in job['exports']] == [0.05, 0.1, 0.2]
+    # Every mesh gets its own file, every height map one
+    objs = [export['obj'] for job in jobs for export in job['exports']]
+    assert len(set(objs)) == 12
+    assert len({job['heightmap'] for job in jobs}) == 4
+
+
+def test_job_generates_once_and_exports_every_threshold(tmp_path, monkeypatch):
+    calls = []
+    generate = mountain_spec.generate_from_spec
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(mountain_spec, 'generate_from_spec', counted)
+    job, = make_jobs([5], grid_sizes=(16,), thresholds=(0.05, 0.5), output_dir=str(tmp_path))
+    entry = run_job(job)
+    assert len(calls) == 1
+    assert all(os.path.getsize(export['obj']) > 0 for export in entry['exports'])
+    assert entry['peak_height'] > 0
@@ -0,0 +1,45 @@
+"""
+Tests of the quadrant meshes built from a height map.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from heightmap_quadrants import heightmap_quadrants, peak_corner
+from mesh_partition import is_closed, signed_volume
+from obj_io import face_array
+
+
+def heights_with_peak(seed, size=10):
+    height_map = np.random.default_rng(seed).uniform(0, 3, (size, size))
+    height_map[height_map < 0.5] = 0.0
+    height_map[size // 2, size // 3] = 5.0
+    return height_map
+
+
+@pytest.mark.parametrize('greedy', [False, True])
+@pytest.mark.parametrize('y_up', [True, False])
+def test_quadrants_are_closed(greedy, y_up):
+    height_map = heights_with_peak(0)
+    quadrants = heightmap_quadrants(height_map, 0.05, y_up=y_up, greedy=greedy)
+    for name, data in quadrants.items():
+        assert is_closed(data['faces']), f"quadrant {name} is open"
+
+
+@pytest.mark.parametrize('split', [None, (0, 0), (3, 7), (10, 10)])
+def test_quadrants_hold_the_whole_mountain(split):
+    height_map = heights_with_peak(1)
+    total = 0.0
+    for data in heightmap_quadrants(height_map, 0.05, split).values():
+        if len(data['faces']):
+            faces, sizes = face_array(data['faces'])
+            total += signed_volume(data['vertices'], faces, sizes)
+    # Cells are 6 / 9 wide on the generator's [-3, 3] grid
+    assert total == pytest.approx(height_map.sum() * (6 / 9) ** 2)
+
+
+def test_peak_is_the_inner_corner_of_ne():
+    height_map = heights_with_peak(2)
+    assert peak_corner(height_map) == (5, 3)
@@ -0,0 +1,66 @@
+"""
+Tests of the welded column meshes.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from mesh_export import column_mesh, histogram_columns
+from mesh_partition import is_closed, partition_grid, signed_volume
+from obj_io import face_array
+
+
+def random_levels(seed):
+    """Small maps with few distinct heights, so neighbours often tie or pinch."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 4, rng.integers(1, 6, 2)).astype(np.float64)
+
+
+def unit_columns(heights, y_up=True, greedy=False):
+    return column_mesh(heights, np.arange(heights.shape[1] + 1.0), np.arange(heights.shape[0] + 1.0),
+                       y_up=y_up, greedy=greedy)
+
+
+@pytest.mark.parametrize('greedy', [False, True])
+@pytest.mark.parametrize('y_up', [True, False])
+def test_two_by_two_map_is_closed(greedy, y_up):
+    heights = np.random.default_rng(0).uniform(0, 3, (2, 2))
+    vertices, faces = unit_columns(heights, y_up, greedy)
+    assert is_closed(faces)
+
+
+@pytest.mark.parametrize('heights', [[[2.0, 0.0], [0.0, 2.0]], [[1.0, 3.0], [3.0, 2.0]]])
+def test_diagonal_columns_touching_on_an_edge_are_closed(heights):
+    vertices, faces = unit_columns(np.array(heights))
+    assert is_closed(faces)
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_maps_are_closed_and_hold_their_volume(seed):
+    heights = random_levels(seed)
+    if not heights.any():
+        pytest.skip("empty map")
+    for greedy in (False, True):
+        vertices, faces = unit_columns(heights, greedy=greedy)
+        faces, sizes = face_array(faces)
+        assert is_closed(faces, sizes)
+        assert signed_volume(vertices, faces, sizes) == pytest.approx(heights.sum())
+
+
+@pytest.mark.parametrize('y_up', [True, False])
+def test_mirrored_z_up_layout_winds_inward(y_up):
+    heights = random_levels(3)
+    vertices, faces = unit_columns(heights, y_up)
+    faces, sizes = face_array(faces)
+    assert signed_volume(vertices, faces, sizes) == pytest.approx(heights.sum() if y_up else -heights.sum())
+
+
+@pytest.mark.parametrize('greedy', [False, True])
+@pytest.mark.parametrize('y_up', [True, False])
+def test_stitched_grid_tiles_of_columns_are_closed(greedy, y_up):
+    heights = np.random.default_rng(5).uniform(0, 3, (12, 12))
+    vertices, faces = histogram_columns(heights, y_up=y_up, greedy=greedy)
+    for name, region in partition_grid(vertices, faces, 3, 3, clip=True, stitch=True).items():
+        assert is_closed(region['faces'], region['sizes']), f"{name} is open"
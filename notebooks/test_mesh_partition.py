@@ -0,0 +1,173 @@
+"""
+Tests of the mesh partitioning and quadrant slicing.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import os
+
+import numpy as np
+import pytest
+
+from mesh_export import BAR_FACES_Z_UP, histogram_bars
+from mountain_heightmap import generate_detailed_mountain
+from mesh_partition import analyze_grid, clip_grid, detect_up_axis, is_closed, partition_grid, split_polygons
+from mountain_slice import fill_sides, find_highest_point_and_tile, parse_obj, split_into_quadrants
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'normalized_histogram_mountain.obj')
+
+
+def closed_bars(height_map, gap, y_up=True):
+    """histogram_bars with every bar wound consistently, so the mesh is closed."""
+    vertices, faces = histogram_bars(height_map, gap=gap, y_up=y_up)
+    faces = 8 * np.arange(len(faces) // 6)[:, None, None] + BAR_FACES_Z_UP[None]
+    return vertices, faces.reshape(-1, 4)
+
+
+def random_heights(seed, size=7):
+    rng = np.random.default_rng(seed)
+    heights = rng.uniform(0, 3, (size, size))
+    heights[rng.uniform(size=heights.shape) < 0.2] = 0.0
+    return heights
+
+
+@pytest.fixture(scope='module')
+def fixture_mesh():
+    # Without the parse cache, so tests write nothing
+    return parse_obj(FIXTURE, cache=False)
+
+
+def test_analyze_grid_detects_z_up_fixture(fixture_mesh):
+    vertices, _ = fixture_mesh
+    grid = analyze_grid(vertices)
+    assert grid['up_axis'] == 2
+    assert grid['axes'] == (0, 1)
+    assert grid['spacing'] == pytest.approx((1 / 39, 1 / 39))
+    assert grid['peak'][2] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('y_up', [True, False])
+def test_detect_up_axis_of_generated_bars(y_up):
+    vertices, _ = closed_bars(random_heights(0), gap=1.0, y_up=y_up)
+    assert detect_up_axis(vertices) == (1 if y_up else 2)
+
+
+def test_up_axis_of_the_fixture_is_detected(fixture_mesh):
+    vertices, _ = fixture_mesh
+    assert detect_up_axis(vertices) == 2
+    assert find_highest_point_and_tile(vertices, None) == find_highest_point_and_tile(vertices, 2)
+
+
+@pytest.fixture(scope='module')
+def generated_heights():
+    return generate_detailed_mountain(40, output_file=None, rng=np.random.default_rng(3))
+
+
+@pytest.mark.parametrize('step', [1.0, 0.5])
+@pytest.mark.parametrize('y_up', [True, False])
+def test_quantized_heights_keep_their_up_axis(generated_heights, step, y_up):
+    # Plateaus: fewer distinct heights than grid lines
+    heights = np.round(generated_heights / step) * step
+    vertices, _ = histogram_bars(heights, y_up=y_up)
+    up = 1 if y_up else 2
+    assert detect_up_axis(vertices) == up
+    highest, corner = find_highest_point_and_tile(vertices, None)
+    assert highest[up] == heights.max()
+    assert (highest, corner) == find_highest_point_and_tile(vertices, up)
+
+
+def test_quadrants_split_on_x_and_z_by_default():
+    # Godot's Y-up layout, as the original script assumed
+    vertices, faces = closed_bars(random_heights(1), gap=0.8, y_up=False)
+    split_point = (0.5, -0.5)
+    default = split_into_quadrants(vertices, faces.tolist(), split_point)
+    explicit = split_into_quadrants(vertices, faces.tolist(), split_point, axes=(0, 2))
+    assert default == explicit
+
+
+def test_split_point_is_a_corner_of_the_peak_cell(fixture_mesh):
+    vertices, _ = fixture_mesh
+    highest, corner = find_highest_point_and_tile(vertices, up_axis=2)
+    vertex_array = np.asarray(vertices)
+    for axis, value in zip((0, 1), corner):
+        # On a grid line of the mesh, exactly, and next to the peak
+        assert np.any(vertex_array[:, axis] == value)
+        assert abs(value - highest[axis]) <= 1 / 39 / 2 + 1e-9
+
+
+@pytest.mark.parametrize('y_up', [True, False])
+def test_faces_in_the_cut_plane_close_their_own_side(y_up):
+    # Touching bars of height 1 west and 2 east, cut on the walls between them
+    vertices, faces = closed_bars(np.array([[1.0, 2.0], [1.0, 2.0]]), gap=1.0, y_up=y_up)
+    up, axes = (1, (0, 2)) if y_up else (2, (0, 1))
+    low, high = clip_grid(vertices, faces, [0.0], [], axes=axes)
+    for region, height in ((low, 1.0), (high, 2.0)):
+        assert len(region['faces']) == 12
+        assert is_closed(region['faces'], region['sizes'])
+        assert region['vertices'][:, up].max() == height
+
+
+def test_fixture_quadrants_are_closed_without_caps(fixture_mesh):
+    # The split lies on grid lines, where touching bars only meet
+    vertices, faces = fixture_mesh
+    _, split_point = find_highest_point_and_tile(vertices, up_axis=2)
+    quadrants = split_into_quadrants(vertices, faces, split_point, clip=True, up_axis=2)
+    assert sum(len(data['faces']) for data in quadrants.values()) == len(faces)
+    for data in quadrants.values():
+        assert is_closed(data['faces'])
+
+
+def test_polygon_touching_the_plane_stays_on_its_side():
+    # Three corners on the plane x = 0, two on the high side
+    vertices = np.array([[0.0, 0, 0], [0, 1, 0], [0, 2, 0], [1, 2, 0], [1, 0, 0]])
+    faces, sizes = np.array([[0, 4, 3, 2, 1]]), np.array([5])
+    _, (low, low_sizes), (high, high_sizes) = split_polygons(vertices, faces, sizes, 0, 0.0)
+    assert len(low) == 0
+    assert high.tolist() == faces.tolist()
+
+
+def assert_quadrants_closed(quadrants):
+    for name, data in quadrants.items():
+        if data['faces']:
+            assert is_closed(data['faces']), f"quadrant {name} is open"
+
+
+def test_fixture_quadrants_are_closed_after_fill_sides(fixture_mesh):
+    vertices, faces = fixture_mesh
+    _, split_point = find_highest_point_and_tile(vertices, up_axis=2)
+    quadrants = split_into_quadrants(vertices, faces, split_point, clip=True, up_axis=2)
+    quadrants = fill_sides(quadrants, split_point, up_axis=2)
+    assert_quadrants_closed(quadrants)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('gap', [0.8, 1.0])
+@pytest.mark.parametrize('y_up', [True, False])
+def test_bar_quadrants_are_closed(seed, gap, y_up):
+    vertices, faces = closed_bars(random_heights(seed), gap, y_up)
+    up = 1 if y_up else 2
+    _, peak_corner = find_highest_point_and_tile(vertices, up)
+    # Through the peak corner, and through the middle of bars
+    through_bars = tuple(np.random.default_rng(seed).uniform(-2.5, 2.5, 2))
+    for split_point in (peak_corner, through_bars):
+        quadrants = split_into_quadrants(vertices, faces.tolist(), split_point, clip=True, up_axis=up)
+        assert_quadrants_closed(fill_sides(quadrants, split_point, up_axis=up))
+
+
+@pytest.mark.parametrize('gap', [0.8, 1.0])
+def test_stitched_grid_tiles_are_closed(gap):
+    vertices, faces = closed_bars(random_heights(7, size=9), gap)
+    for name, region in partition_grid(vertices, faces, 3, 2, clip=True, stitch=True).items():
+        assert is_closed(region['faces'], region['sizes']), f"{name} is open"
+
+
+
+@pytest.mark.parametrize('y_up', [True, False])
+def test_seams_run_through_crossing_cut_lines(y_up):
+    # Seams of touching bars that meet a crossing cut plane continue on the
+    # other side of its line and must be capped as one loop
+    heights = np.array([[2.0, 2.0, 1.0], [3.0, 1.0, 2.0], [1.0, 1.0, 3.0]])
+    vertices, faces = closed_bars(heights, gap=1.0, y_up=y_up)
+    axes = (0, 2) if y_up else (0, 1)
+    for region in clip_grid(vertices, faces, [1.2], [-1.2, 1.3], stitch=True, axes=axes):
+        assert is_closed(region['faces'], region['sizes'])
@@ -0,0 +1,43 @@
+"""
+Tests of the shared OBJ reader.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import numpy as np
+
+import terrain_cache
+from obj_io import cache_path, read_obj
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'mesh.obj'
+    path.write_text(text)
+    return str(path)
+
+
+def test_indented_lines_are_read(tmp_path):
+    path = write(tmp_path, "# indented\n  v 0 0 0\n\tv 1 0 0\n v 0 1 0\n\n   \n  f 1 2 3\n\t f 3/1 2/1 1/1\n")
+    vertices, faces = read_obj(path, dtype=np.float64, cache=False)
+    assert vertices.tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+    assert faces.tolist() == [[0, 1, 2], [2, 1, 0]]
+
+
+def test_other_keywords_starting_with_v_or_f_are_skipped(tmp_path):
+    path = write(tmp_path, "v 0 0 0\n vt 0 0\nvn 0 0 1\nv 1 0 0\nv 0 1 0\n  fo 1\nf 1 2 -1")
+    vertices, faces = read_obj(path, cache=False)
+    assert len(vertices) == 3
+    assert faces.tolist() == [[0, 1, 2]]
+
+
+def test_parse_cache_is_kept_out_of_the_input_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(terrain_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    (tmp_path / 'input').mkdir()
+    path = str(tmp_path / 'input' / 'mesh.obj')
+    with open(path, 'w') as f:
+        f.write("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+    first = read_obj(path)
+    assert sorted(p.name for p in (tmp_path / 'input').iterdir()) == ['mesh.obj']
+    assert cache_path(path).startswith(str(tmp_path / 'cache'))
+    second = read_obj(path)
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
@@ -0,0 +1,28 @@
+"""
+Tests of the welded column export of the grouped OBJ columns.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import pytest
+
+from mesh_partition import is_closed
+from obj_io import read_obj
+from obj_parsing import write_welded_columns
+
+
+@pytest.mark.parametrize('columns', [{}, {(0.0, 0.0): {'heights': []}, (1.0, 0.0): {'heights': [0.0, 0.0]}}])
+def test_no_standing_column_writes_an_empty_mesh(tmp_path, columns):
+    path = str(tmp_path / 'welded.obj')
+    write_welded_columns(columns, 1.0, path)
+    vertices, faces = read_obj(path, cache=False)
+    assert len(vertices) == 0 and len(faces) == 0
+
+
+def test_welded_columns_are_closed(tmp_path):
+    columns = {(0.0, 0.0): {'heights': [0.0, 2.0]}, (1.0, 0.0): {'heights': [1.0]},
+               (1.0, 1.0): {'heights': [0.0]}}
+    path = str(tmp_path / 'welded.obj')
+    write_welded_columns(columns, 1.0, path)
+    vertices, faces = read_obj(path, cache=False)
+    assert is_closed(faces)
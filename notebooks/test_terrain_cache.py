@@ -0,0 +1,40 @@
+"""
+Tests of the height map cache.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+import terrain_cache
+from mountain_heightmap import generate_detailed_mountain
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(terrain_cache, 'CACHE_DIR', str(tmp_path))
+
+
+def test_hit_leaves_rng_where_a_miss_does():
+    runs = []
+    for _ in range(2):
+        rng = np.random.default_rng(11)
+        height_map = generate_detailed_mountain(16, output_file=None, rng=rng, cache=True)
+        runs.append((height_map, rng.random(4)))
+    (miss_map, miss_next), (hit_map, hit_next) = runs
+    uncached_rng = np.random.default_rng(11)
+    uncached = generate_detailed_mountain(16, output_file=None, rng=uncached_rng)
+    assert np.array_equal(miss_map, uncached) and np.array_equal(hit_map, uncached)
+    assert np.array_equal(hit_next, miss_next)
+    assert np.array_equal(hit_next, uncached_rng.random(4))
+
+
+@pytest.mark.parametrize('bit_generator', [np.random.PCG64, np.random.MT19937, np.random.Philox])
+def test_cached_array_restores_any_bit_generator(bit_generator):
+    def draw(rng):
+        return terrain_cache.cached_array('key-' + bit_generator.__name__, lambda: rng.random(3), rng=rng)
+
+    first, second = np.random.Generator(bit_generator(3)), np.random.Generator(bit_generator(3))
+    assert np.array_equal(draw(first), draw(second))
+    assert first.random() == second.random()